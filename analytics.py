@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# === Time-windowed hotspot analytics ===
+# Incidents of each period are bucketed once into (key x time-of-day bin)
+# counts, where key is a Location or a lat/lon grid cell. Circular prefix sums
+# over the bins then give the count for any window, including ones that wrap
+# past midnight, with a single subtraction, so trend queries never rescan the
+# incident rows.
+BIN_MINUTES = 15
+BINS_PER_DAY = 24 * 60 // BIN_MINUTES
+CELL_SIZE_DEG = 0.01
+
+
+def parse_minutes(times):
+    # 'HH:MM' strings -> minute of day; unparseable values become NaN
+    parts = times.astype(str).str.strip().str.split(':', n=1, expand=True)
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce') if parts.shape[1] > 1 else 0
+    total = hours * 60 + minutes
+    return total.where((total >= 0) & (total < 24 * 60))
+
+
+def cell_keys(lat, lon, cell_size=CELL_SIZE_DEG):
+    rows = np.floor(np.asarray(lat, dtype=float) / cell_size).astype(np.int64)
+    cols = np.floor(np.asarray(lon, dtype=float) / cell_size).astype(np.int64)
+    return pd.Series(rows).astype(str).str.cat(pd.Series(cols).astype(str), sep=':').to_numpy()
+
+
+def _keys(df, by, cell_size):
+    if by == 'location':
+        return df['Location'].astype(str).str.strip().str.lower().to_numpy()
+    if by == 'cell':
+        return cell_keys(df['Latitude'], df['Longitude'], cell_size)
+    raise ValueError(f'Unknown grouping {by!r}')
+
+
+def bin_counts(df, by='location', cell_size=CELL_SIZE_DEG):
+    minutes = parse_minutes(df['Time'])
+    valid = minutes.notna().to_numpy()
+    frame = pd.DataFrame({
+        'key': _keys(df, by, cell_size)[valid],
+        'bin': (minutes[valid] // BIN_MINUTES).astype(np.int64).to_numpy(),
+    })
+    counts = frame.groupby(['key', 'bin']).size().unstack(fill_value=0)
+    return counts.reindex(columns=range(BINS_PER_DAY), fill_value=0)
+
+
+class HotspotAnalytics:
+
+    def __init__(self, periods, by='location', cell_size=CELL_SIZE_DEG):
+        # periods: {'past': DataFrame, 'current': DataFrame}
+        self.by = by
+        self.cell_size = cell_size
+        counts = {name: bin_counts(df, by, cell_size) for name, df in periods.items()}
+        self.keys = pd.Index(sorted(set().union(*(c.index for c in counts.values()))), name=by)
+        self.periods = list(counts)
+        self._prefix = {}
+        for name, c in counts.items():
+            c = c.reindex(self.keys, fill_value=0).to_numpy(dtype=np.int64)
+            # Two days back to back so a window crossing midnight is contiguous
+            doubled = np.concatenate([c, c], axis=1)
+            self._prefix[name] = np.concatenate(
+                [np.zeros((len(self.keys), 1), dtype=np.int64), np.cumsum(doubled, axis=1)], axis=1)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, past_path='past_crime_data.csv', current_path='current_crime_data.csv', **kwargs):
+        return cls({'past': pd.read_csv(past_path), 'current': pd.read_csv(current_path)}, **kwargs)
+
+    def window_counts(self, start_minute, hours):
+        start = int(start_minute) % (24 * 60) // BIN_MINUTES
+        width = max(1, min(BINS_PER_DAY, int(round(hours * 60 / BIN_MINUTES))))
+        key = (start, width)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        frame = pd.DataFrame(
+            {name: p[:, start + width] - p[:, start] for name, p in self._prefix.items()},
+            index=self.keys)
+        frame.attrs['hours'] = width * BIN_MINUTES / 60
+        with self._lock:
+            self._cache[key] = frame
+        return frame
+
+    def window_rates(self, start_minute, hours, min_change=0.5, min_ratio=1.5):
+        # Incidents per hour of the window in each period, with the change from
+        # past to current; a location is "emerging" when its rate both rises by
+        # at least min_change and grows by at least min_ratio.
+        counts = self.window_counts(start_minute, hours)
+        rates = counts / counts.attrs['hours']
+        past, current = rates['past'], rates['current']
+        change = current - past
+        ratio = (current / past.where(past > 0)).fillna(np.inf).where(current > 0, 0.0)
+        result = pd.DataFrame({
+            'past_rate': past, 'current_rate': current, 'change': change, 'ratio': ratio,
+            'emerging': (change >= min_change) & (ratio >= min_ratio),
+        })
+        return result.sort_values(['emerging', 'change'], ascending=False)
+
+    def emerging_hotspots(self, start_minute, hours, **kwargs):
+        rates = self.window_rates(start_minute, hours, **kwargs)
+        return rates[rates['emerging']]
+
+    def sliding_windows(self, hours, step_minutes=60, **kwargs):
+        # Rates for every window of the given length across the day
+        for start in range(0, 24 * 60, step_minutes):
+            yield start, self.window_rates(start, hours, **kwargs)
@@ -0,0 +1,262 @@
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, jsonify, request, session
+
+from config import settings
+
+# === JSON API ===
+# Plain sync views next to the HTML routes (there is no asyncio here). They
+# hand model work to a small bounded executor, so CPU-bound inference never
+# runs on more than API_WORKERS threads at once and a burst of slow API calls
+# is rejected (503) instead of queueing behind the HTML routes. The request
+# thread just waits on the result, so every open call holds one server
+# thread: slow clients are made cheap by the buffering reverse proxy in front
+# of gunicorn (see gunicorn.conf.py), not by this module. Single predictions skip the
+# executor and go to core's micro-batcher, whose one thread already bounds
+# the inference; routing them through API_WORKERS threads would cap each
+# batch at API_WORKERS rows.
+API_WORKERS = settings.workers.api_workers
+API_MAX_PENDING = settings.workers.api_max_pending
+API_MAX_BATCH = settings.workers.api_max_batch
+API_MAX_ROUTE_POINTS = settings.workers.api_max_route_points
+LIVE_MAX_CLIENTS = settings.live.max_clients
+INGEST_USERS = set(settings.auth.ingest_users)
+INGEST_API_KEYS = [key.encode() for key in settings.auth.ingest_api_keys]
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix='api-inference')
+_pending = threading.BoundedSemaphore(API_MAX_PENDING)
+
+
+class Busy(Exception):
+    pass
+
+
+def _admitted(fn, *args, **kwargs):
+    # fn(...) on this thread, unless API_MAX_PENDING calls are already open
+    if not _pending.acquire(blocking=False):
+        raise Busy()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _pending.release()
+
+
+def _offload(fn, *args, **kwargs):
+    return _admitted(lambda: _executor.submit(fn, *args, **kwargs).result())
+
+
+def _backend():
+    return current_app.extensions['safety_api']
+
+
+def _error(message, status=400):
+    return jsonify(error=message), status
+
+
+@api.errorhandler(Busy)
+def _busy(_):
+    return _error('Server busy, retry shortly.', 503)
+
+
+@api.before_request
+def _require_login():
+    if request.endpoint == 'api.ingest' and _has_ingest_key():
+        return None
+    if 'username' not in session:
+        return _error('Login required.', 401)
+
+
+def _has_ingest_key():
+    key = request.headers.get('X-API-Key', '').encode()
+    return bool(key) and any(hmac.compare_digest(key, k) for k in INGEST_API_KEYS)
+
+
+def _data_etag():
+    # Data-derived responses are tagged with what has been read of the
+    # incident file (see DatasetVersion.tag), so map clients polling an
+    # unchanged dataset get a bodiless 304 from any worker
+    etag = f'd{_offload(_backend()["dataset_tag"])}'
+    return etag, etag in request.if_none_match
+
+
+def _tagged(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _crime_row(item):
+    try:
+        return str(item['location']), str(item['time']), str(item['crime_type'])
+    except (KeyError, TypeError):
+        raise ValueError('Each item needs location, time and crime_type.')
+
+
+@api.route('/predict', methods=['POST'])
+def predict():
+    try:
+        row = _crime_row(request.get_json(silent=True))
+    except ValueError as e:
+        return _error(str(e))
+    batcher = _backend().get('prediction_batcher')
+    if batcher is not None:
+        severity = _admitted(batcher, row)
+    else:
+        severity = _offload(_backend()['predict_severity'], *row)
+    place = _backend()['resolve_location'](row[0])
+    return jsonify(severity=severity, location=place._asdict() if place else None)
+
+
+@api.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    items = (request.get_json(silent=True) or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return _error('Expected a non-empty "items" list.')
+    if len(items) > API_MAX_BATCH:
+        return _error(f'At most {API_MAX_BATCH} items per batch.')
+    try:
+        rows = [_crime_row(item) for item in items]
+    except ValueError as e:
+        return _error(str(e))
+    severities = _offload(_backend()['predict_batch'], rows)
+    return jsonify(severities=severities)
+
+
+@api.route('/incidents/nearby')
+def nearby():
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius_km = float(request.args.get('radius_km', 1.0))
+        limit = int(request.args.get('limit', 50))
+    except (KeyError, ValueError):
+        return _error('lat and lon are required numbers.')
+    incidents = _offload(_backend()['nearby_incidents'], lat, lon, radius_km, max(1, min(limit, 500)))
+    return jsonify(incidents=incidents)
+
+
+@api.route('/hotspots')
+def hotspots():
+    # KMeans clusters plus the strongest peaks of the KDE density surface
+    try:
+        n = max(1, min(int(request.args.get('peaks', 10)), 100))
+    except ValueError:
+        return _error('peaks must be an integer.')
+    etag, fresh = _data_etag()
+    if fresh:
+        return _tagged(current_app.response_class(status=304), etag)
+    clusters = _offload(_backend()['hotspot_summary'])
+    peaks = _offload(_backend()['density_peaks'], n)
+    return _tagged(jsonify(hotspots=clusters, peaks=peaks), etag)
+
+
+@api.route('/trends')
+def trends():
+    # ?start=HH:MM&hours=3&by=location|cell&emerging=1
+    try:
+        hours_part, _, minutes_part = request.args.get('start', '00:00').partition(':')
+        start = int(hours_part) * 60 + int(minutes_part or 0)
+        hours = float(request.args.get('hours', 3))
+    except ValueError:
+        return _error('start must be HH:MM and hours a number.')
+    by = request.args.get('by', 'location')
+    if by not in ('location', 'cell') or not 0 < hours <= 24:
+        return _error('by must be location or cell and hours in (0, 24].')
+    report = _offload(_backend()['trend_report'], start, hours, by, request.args.get('emerging') == '1')
+    return jsonify(start=start, hours=hours, by=by, trends=report)
+
+
+@api.route('/forecast')
+def forecast():
+    # Precomputed table lookup, cheap enough to answer inline
+    location = request.args.get('location', '').strip()
+    if not location:
+        return _error('location is required.')
+    rows = _backend()['forecast_lookup'](location, request.args.get('crime_type') or None)
+    if not rows:
+        return _error('No forecast for that location.', 404)
+    return jsonify(forecasts=rows)
+
+
+@api.route('/risk')
+def risk():
+    page = request.args.get('page', 1, type=int)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 200))
+    return jsonify(_backend()['risk_page'](page, per_page))
+
+
+@api.route('/incidents', methods=['POST'])
+def ingest():
+    # {"incidents": [{"location", "time", "crime_type", "severity", "latitude", "longitude"}, ...]}
+    # Rows land in crime_data.csv and every map, so being logged in isn't enough
+    if not (_has_ingest_key() or session.get('username') in INGEST_USERS):
+        return _error('Not allowed to submit incidents.', 403)
+    items = (request.get_json(silent=True) or {}).get('incidents')
+    if not isinstance(items, list) or not items:
+        return _error('Expected a non-empty "incidents" list.')
+    try:
+        records = [{'Location': i['location'], 'Time': i['time'], 'CrimeType': i['crime_type'],
+                    'Severity': i['severity'], 'Latitude': i['latitude'], 'Longitude': i['longitude']}
+                   for i in items]
+    except (KeyError, TypeError):
+        return _error('Each incident needs location, time, crime_type, severity, latitude and longitude.')
+    ingested = _offload(_backend()['ingest_incidents'], records)
+    return jsonify(ingested=ingested, rejected=len(records) - ingested)
+
+
+@api.route('/route/score', methods=['POST'])
+def route_score():
+    # {"points": [[lat, lon], ...], "spacing_m": 25}
+    body = request.get_json(silent=True) or {}
+    points = body.get('points')
+    if not isinstance(points, list) or not 2 <= len(points) <= API_MAX_ROUTE_POINTS:
+        return _error(f'Expected "points" with 2 to {API_MAX_ROUTE_POINTS} [lat, lon] pairs.')
+    try:
+        spacing_m = max(5.0, float(body.get('spacing_m', 25.0)))
+        result = _offload(_backend()['route_risk'], points, spacing_m)
+    except (TypeError, ValueError) as e:
+        return _error(str(e) or 'Invalid route.')
+    return jsonify(result)
+
+
+@api.route('/clusters')
+def clusters():
+    # ?zoom=Z&bbox=south,west,north,east -> GeoJSON of clusters in view
+    try:
+        zoom = max(0, min(int(request.args.get('zoom', 0)), 22))
+        bbox = request.args.get('bbox')
+        bbox = tuple(float(v) for v in bbox.split(',')) if bbox else None
+    except ValueError:
+        return _error('zoom must be an integer and bbox four numbers.')
+    if bbox is not None and len(bbox) != 4:
+        return _error('bbox must be south,west,north,east.')
+    etag, fresh = _data_etag()
+    if fresh:
+        return _tagged(current_app.response_class(status=304), etag)
+    return _tagged(jsonify(_offload(_backend()['cluster_query'], zoom, bbox)), etag)
+
+
+@api.route('/live')
+def live():
+    # Server-Sent Events: incidents appended after ?after=<offset> (or the
+    # Last-Event-ID a reconnecting browser sends), then each new append.
+    # Waiting clients share one ring buffer (see livefeed.py).
+    if _backend()['live_feed'].clients >= LIVE_MAX_CLIENTS:
+        return _error('Too many live clients, retry shortly.', 503)
+    after = request.headers.get('Last-Event-ID') or request.args.get('after')
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        return _error('after must be an integer offset.')
+    return current_app.response_class(_backend()['live_stream'](after), mimetype='text/event-stream',
+                                      headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def init_api(app, **backend):
+    app.extensions['safety_api'] = backend
+    app.register_blueprint(api)
+    return app
@@ -1,83 +1,33 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session
-import sqlite3
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.svm import SVC
-from sklearn.cluster import KMeans
-import folium
+from flask import Flask, Blueprint, render_template_string, request, redirect, url_for, session, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import secrets
+import core
+from core import load_models, predict_crime, risk_page, canonical_location, generate_heatmap, heatmap_regions, prediction_batcher
+from auth import login_throttle, login_user, register_user
+from config import settings
+from profiling import init_profiling
+from sessions import init_sessions
+from memstats import memory_usage
+from api import init_api
+import pr
+import final
 
 app = Flask(__name__)
-app.secret_key = 'secret123'
-
-# === DB Setup ===
-if not os.path.exists('users.db'):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)''')
-    conn.commit()
-    conn.close()
-
-# === Load Data and Train Models ===
-crime_data = pd.read_csv('crime_data.csv')
-
-label_encoders = {}
-model_svm = None
-model_kmeans = None
-
-def preprocess(df):
-    df = df.dropna()
-    for col in ['Location', 'Time', 'CrimeType']:
-        df[col] = df[col].astype(str).str.lower().str.strip()
-        
-        if col not in label_encoders:
-            le = LabelEncoder()
-            df[col] = df[col].fillna('unknown')
-            le.fit(list(df[col].unique()) + ['unknown'])
-            df[col] = le.transform(df[col])
-            label_encoders[col] = le
-        else:
-            le = label_encoders[col]
-            # Replace unseen values with 'unknown'
-            df[col] = df[col].apply(lambda x: x if x in le.classes_ else 'unknown')
-            
-            if 'unknown' not in le.classes_:
-                le.classes_ = np.append(le.classes_, 'unknown')
-            df[col] = le.transform(df[col])    
-           # df[col] = label_encoders[col].transform(df[col])
-    return df
-
-def train_models():
-    global model_svm, model_kmeans
-    df = preprocess(crime_data.copy())
-    X = df[['Location', 'Time', 'CrimeType']]
-    y = df['Severity'] if 'Severity' in df else df.iloc[:, -1]
-    model_svm = SVC()
-    model_svm.fit(X, y)
-    model_kmeans = KMeans(n_clusters=5, n_init=10)
-    model_kmeans.fit(df[['Latitude', 'Longitude']])
-
-def predict_crime(location, time, crime_type):
-    df = pd.DataFrame([[location, time, crime_type]], columns=['Location', 'Time', 'CrimeType'])
-    df = preprocess(df)
-    prediction = model_svm.predict(df)[0]
-    return f"Predicted Crime Severity: {prediction}"
-
-def generate_heatmap():
-    df = crime_data.copy()
-    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=12)
-    for _, row in df.iterrows():
-        folium.CircleMarker(
-            location=[row['Latitude'], row['Longitude']],
-            radius=5,
-            popup=row['CrimeType'],
-            fill=True,
-            color='red',
-            fill_opacity=0.7
-        ).add_to(map_)
-    return map_._repr_html_()
-
-train_models()
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+# Behind PROXY_COUNT proxies request.remote_addr is the real client, not the
+# proxy, so login throttling doesn't put every user in one bucket
+if settings.auth.proxy_count:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.auth.proxy_count, x_proto=settings.auth.proxy_count,
+                            x_host=settings.auth.proxy_count)
+init_profiling(app)
+
+# Sessions live in users.db next to the accounts (see sessions.py and auth.py)
+init_sessions(app)
+
+# The original UI is served at /, the pr.py and final.py variants under
+# /pr and /final, all on the one loaded model (see core.py)
+bp = Blueprint('main', __name__)
 
 base_css = """
 <style>
@@ -129,10 +79,22 @@ h3 {
     height: 600px;
     margin: 20px auto;
 }
+table {
+    width: 100%;
+    margin-top: 20px;
+    border-collapse: collapse;
+}
+th, td {
+    padding: 8px;
+    border: 1px solid #dee2e6;
+}
+th {
+    background-color: #e9ecef;
+}
 </style>
 """
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template_string(f'''
     <html><head><title>Safety Locator</title>{base_css}</head>
@@ -140,25 +102,19 @@ def index():
         <div class="card">
             <h2>🚨 Safety Locator</h2>
             <p>Crime Rate and Hotspot Prediction System for Women</p>
-            <a href="{{{{ url_for('login') }}}}" class="button">Login</a>
-            <a href="{{{{ url_for('register') }}}}" class="button" style="background-color:#28a745;">Register</a>
+            <a href="{{{{ url_for('.login') }}}}" class="button">Login</a>
+            <a href="{{{{ url_for('.register') }}}}" class="button" style="background-color:#28a745;">Register</a>
         </div>
     </body></html>
     ''')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
-        u, p = request.form['username'], request.form['password']
-        try:
-            conn = sqlite3.connect('users.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (u, p))
-            conn.commit()
-            conn.close()
-            return redirect(url_for('login'))
-        except:
-            return "Username already exists."
+        error = register_user(request.form['username'], request.form['password'])
+        if error:
+            return error
+        return redirect(url_for('.login'))
     return render_template_string(f'''
     <html><head><title>Register</title>{base_css}</head>
     <body>
@@ -169,24 +125,17 @@ def register():
             <input name="password" type="password" placeholder="Create password" required>
             <input type="submit" value="Register">
         </form>
-        <p><a href="{{{{ url_for('login') }}}}" class="button" style="background-color:#6c757d;">Already have an account?</a></p>
+        <p><a href="{{{{ url_for('.login') }}}}" class="button" style="background-color:#6c757d;">Already have an account?</a></p>
     </div></body></html>
     ''')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        u, p = request.form['username'], request.form['password']
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE username=? AND password=?", (u, p))
-        user = c.fetchone()
-        conn.close()
-        if user:
-            session['username'] = u
-            return redirect(url_for('dashboard'))
-        else:
-            return "Invalid credentials."
+        error = login_user(request.form['username'], request.form['password'])
+        if error:
+            return error
+        return redirect(url_for('.dashboard'))
     return render_template_string(f'''
     <html><head><title>Login</title>{base_css}</head>
     <body>
@@ -197,14 +146,15 @@ def login():
             <input name="password" type="password" placeholder="Password" required>
             <input type="submit" value="Login">
         </form>
-        <p><a href="{{{{ url_for('register') }}}}" class="button" style="background-color:#6c757d;">New user? Register</a></p>
+        <p><a href="{{{{ url_for('.register') }}}}" class="button" style="background-color:#6c757d;">New user? Register</a></p>
     </div></body></html>
     ''')
 
-@app.route('/dashboard', methods=['GET', 'POST'])
+@bp.route('/dashboard', methods=['GET', 'POST'])
 def dashboard():
     if 'username' not in session:
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
+    load_models()
     
     prediction = None
     if request.method == 'POST':
@@ -212,6 +162,7 @@ def dashboard():
         time = request.form['time']
         crime_type = request.form['crime_type']
         prediction = predict_crime(location, time, crime_type)
+    risk = risk_page(request.args.get('page', 1, type=int))
 
     return render_template_string(f'''
     <html><head><title>Dashboard</title>{base_css}</head>
@@ -219,35 +170,108 @@ def dashboard():
     <div class="form-box">
         <h2>Welcome, {{{{ session['username'] }}}} 👋</h2>
         <form method="post">
-            <input name="location" placeholder="Enter Location" required>
+            <input name="location" placeholder="Enter Location" value="{{{{ session.get('home_location', '') }}}}" required>
             <input name="time" placeholder="Time (e.g. 23:00)" required>
             <input name="crime_type" placeholder="Crime Type" required>
             <input type="submit" value="Predict Crime">
         </form>
         {{% if prediction %}}<h3>{{{{ prediction }}}}</h3>{{% endif %}}
-        <a href="{{{{ url_for('heatmap') }}}}" class="button">View Hotspot Map</a>
-        <a href="{{{{ url_for('logout') }}}}" class="button" style="background-color:#dc3545;">Logout</a>
+        <form method="post" action="{{{{ url_for('.preferences') }}}}">
+            <input name="home_location" placeholder="Home location" value="{{{{ session.get('home_location', '') }}}}">
+            <input type="submit" value="Save Home Location" style="background-color:#6c757d;">
+        </form>
+        <a href="{{{{ url_for('.heatmap') }}}}" class="button">View Hotspot Map</a>
+        <a href="{{{{ url_for('.logout') }}}}" class="button" style="background-color:#dc3545;">Logout</a>
+    </div>
+    <div class="card" style="max-width:800px;">
+        <h2>📊 Location Risk Scores</h2>
+        <table>
+            <tr><th>Location</th><th>Incidents</th><th>Risk Score</th><th>Avg Severity</th><th>Peak Hour</th><th>Night / Morning / Afternoon / Evening</th></tr>
+            {{% for r in risk.rows %}}
+            <tr><td>{{{{ r.location }}}}</td><td>{{{{ r.incidents }}}}</td><td>{{{{ r.score }}}}</td><td>{{{{ r.mean_severity }}}}</td>
+                <td>{{{{ r.peak_hour or '-' }}}}</td><td>{{{{ r.profile.values()|join(' / ') }}}}</td></tr>
+            {{% endfor %}}
+        </table>
+        <p>
+            {{% if risk.page > 1 %}}<a href="{{{{ url_for('.dashboard', page=risk.page - 1) }}}}">← Prev</a>{{% endif %}}
+            Page {{{{ risk.page }}}} of {{{{ risk.pages }}}}
+            {{% if risk.page < risk.pages %}}<a href="{{{{ url_for('.dashboard', page=risk.page + 1) }}}}">Next →</a>{{% endif %}}
+        </p>
     </div></body></html>
-    ''', prediction=prediction)
+    ''', prediction=prediction, risk=risk)
 
-@app.route('/heatmap')
+@bp.route('/preferences', methods=['POST'])
+def preferences():
+    if 'username' not in session:
+        return redirect(url_for('.login'))
+    home = request.form.get('home_location', '').strip()
+    if home:
+        session['home_location'] = canonical_location(home)
+    else:
+        session.pop('home_location', None)
+    return redirect(url_for('.dashboard'))
+
+@bp.route('/heatmap')
 def heatmap():
     if 'username' not in session:
-        return redirect(url_for('login'))
-    map_html = generate_heatmap()
+        return redirect(url_for('.login'))
+    load_models()
+    map_html = generate_heatmap(request.args.get('region'))
     return render_template_string(f'''
     <html><head><title>Heatmap</title>{base_css}</head>
     <body>
         <h2>🗺️ Crime Hotspot Heatmap</h2>
+        <p>{{% for region in regions %}}<a href="{{{{ url_for('.heatmap', region=region) }}}}">{{{{ region }}}}</a> {{% endfor %}}</p>
         <div class="map-container">{{{{ map_html|safe }}}}</div>
-        <a href="{{{{ url_for('dashboard') }}}}" class="button">← Back to Dashboard</a>
+        <a href="{{{{ url_for('.dashboard') }}}}" class="button">← Back to Dashboard</a>
     </body></html>
-    ''', map_html=map_html)
+    ''', map_html=map_html, regions=heatmap_regions())
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
-    session.pop('username', None)
-    return redirect(url_for('index'))
+    # Drops the server-side session row as well
+    session.clear()
+    return redirect(url_for('.index'))
+
+app.register_blueprint(bp)
+app.register_blueprint(pr.bp, url_prefix='/pr')
+app.register_blueprint(final.bp, url_prefix='/final')
+
+@app.route('/ready')
+def ready():
+    ready, error = core.model_status()
+    status = {'ready': ready, 'startup_mode': core.STARTUP_MODE,
+              'pid': os.getpid(), 'memory_kb': memory_usage()}
+    if error:
+        status['error'] = error
+    return jsonify(status), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics():
+    report = core.crime_data_report
+    return jsonify(login=login_throttle.stats(), prediction_batching=prediction_batcher.stats(),
+                   crime_data=report._asdict() if report else None,
+                   dedup=core._dedup.stats() if core._dedup else None, caches=core.cache_stats(),
+                   live=core.live_feed.stats(),
+                   regions={region: model.rows for region, model in core.region_models.items()})
+
+init_api(app, predict_severity=core.predict_severity, predict_batch=core.predict_batch,
+         nearby_incidents=core.nearby_incidents, hotspot_summary=core.hotspot_summary,
+         trend_report=core.trend_report, forecast_lookup=core.forecast_lookup,
+         density_peaks=core.density_peaks, risk_page=risk_page,
+         ingest_incidents=core.ingest_incidents, resolve_location=core.resolve_location,
+         route_risk=core.route_risk, cluster_query=core.cluster_query, dataset_tag=core.dataset_tag,
+         live_stream=core.live_stream, live_feed=core.live_feed,
+         prediction_batcher=prediction_batcher if core.PREDICT_BATCH_WAIT_MS > 0 else None)
+
+def create_app(preload=True):
+    # App factory for multi-worker servers: with gunicorn's preload_app the
+    # dataset and models are loaded once here and shared copy-on-write by the
+    # forked workers (see gunicorn.conf.py).
+    if preload:
+        load_models()
+        core.freeze_snapshot()
+    return app
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,52 @@
+import os
+import sqlite3
+from contextlib import closing
+
+from flask import request, session
+
+from config import settings
+from passwords import authenticate, hash_password
+from ratelimit import LoginThrottle
+
+# === Accounts ===
+# Registration and login shared by every UI blueprint; each blueprint only
+# renders its own pages around these.
+
+USERS_DB = settings.data.users_db
+
+# === DB Setup ===
+if not os.path.exists(USERS_DB):
+    conn = sqlite3.connect(USERS_DB)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)''')
+    conn.commit()
+    conn.close()
+
+login_throttle = LoginThrottle()
+
+
+def register_user(u, p):
+    # None once the account exists, otherwise the error response
+    if not login_throttle.attempt(request.remote_addr):
+        return "Too many attempts. Please try again later.", 429
+    try:
+        with closing(sqlite3.connect(USERS_DB)) as conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (u, hash_password(p)))
+            conn.commit()
+    except sqlite3.IntegrityError:
+        return "Username already exists."
+    return None
+
+
+def login_user(u, p):
+    # None once the session is logged in, otherwise the error response
+    if not login_throttle.attempt(request.remote_addr, u):
+        return "Too many login attempts. Please try again later.", 429
+    with closing(sqlite3.connect(USERS_DB)) as conn:
+        user = authenticate(conn, u, p)
+    if not user:
+        login_throttle.failed(u)
+        return "Invalid credentials."
+    session.regenerate()
+    session['username'] = u
+    return None
@@ -0,0 +1,35 @@
+# Throughput of predict_severity() from many concurrent callers, with and
+# without micro-batching.
+#   python bench_batching.py [threads] [calls_per_thread]
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import core
+
+
+def _run(threads, calls):
+    rows = [('Downtown', '22:00', 'Assault'), ('Uptown', '19:00', 'Theft'), ('Chennai', '23:45', 'Molestation')]
+
+    def worker(n):
+        for i in range(calls):
+            core.predict_severity(*rows[(n + i) % len(rows)])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+    return threads * calls / elapsed
+
+
+if __name__ == '__main__':
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    core.load_models()
+
+    wait_ms = core.PREDICT_BATCH_WAIT_MS
+    core.PREDICT_BATCH_WAIT_MS = 0
+    print(f'unbatched: {_run(threads, calls):.0f} predictions/s')
+    core.PREDICT_BATCH_WAIT_MS = wait_ms or 2
+    print(f'batched ({core.PREDICT_BATCH_WAIT_MS} ms window): {_run(threads, calls):.0f} predictions/s '
+          f'{core.prediction_batcher.stats()}')
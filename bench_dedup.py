@@ -0,0 +1,50 @@
+# Ingest-side dedup over a synthetic feed where 30% of the records are
+# resends, with the in-memory index alone and with the SQLite key table.
+#   python bench_dedup.py [records] [batch]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleaning import clean_incidents
+from dedup import DedupIndex
+
+
+def _feed(n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = n * 7 // 10
+    df = pd.DataFrame({
+        'Location': rng.choice(['Downtown', 'Uptown', 'Midtown', 'Suburb'], base),
+        'Time': [f'{h:02d}:{m:02d}' for h, m in zip(rng.integers(0, 24, base), rng.integers(0, 60, base))],
+        'CrimeType': rng.choice(['Assault', 'Theft', 'Robbery'], base),
+        'Severity': rng.integers(1, 5, base),
+        'Latitude': 40.7 + rng.random(base) / 10,
+        'Longitude': -74 + rng.random(base) / 10,
+    })
+    # Resends differ in case, so the cleaning stage alone doesn't catch them
+    resent = df.sample(n - base, random_state=seed)
+    resent['Location'] = resent['Location'].str.upper()
+    return pd.concat([df, resent], ignore_index=True).sample(frac=1, random_state=seed)
+
+
+def _run(feed, batch, db_path):
+    index = DedupIndex(db_path=db_path)
+    kept = 0
+    start = time.perf_counter()
+    for i in range(0, len(feed), batch):
+        kept += int(index.filter_new(feed.iloc[i:i + batch]).sum())
+    return time.perf_counter() - start, kept
+
+
+if __name__ == '__main__':
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    feed, _ = clean_incidents(_feed(records))
+    elapsed, kept = _run(feed, batch, None)
+    print(f'memory: {elapsed:.2f} s, kept {kept} of {len(feed)}')
+    with tempfile.TemporaryDirectory() as tmp:
+        elapsed, kept = _run(feed, batch, os.path.join(tmp, 'keys.db'))
+    print(f'sqlite: {elapsed:.2f} s, kept {kept} of {len(feed)}')
@@ -0,0 +1,70 @@
+# Resident memory per worker with and without preloading in the master.
+#   python bench_preload.py [workers]
+# 'independent' starts each worker fresh (spawn), the way a server without
+# preload_app does; 'preload' loads once via create_app() and forks.
+import multiprocessing as mp
+import os
+import queue as queue_mod
+import sys
+import time
+
+from memstats import memory_usage
+
+WARMUP_TIMEOUT = 600
+
+
+def _warm_and_report(queue, ready):
+    import app
+    import core
+    core.predict_crime('Downtown', '22:00', 'Assault')
+    # The heatmap is built the way /heatmap builds it, with its API layers
+    with app.app.test_request_context('/heatmap'):
+        core.generate_heatmap()
+    queue.put((os.getpid(), memory_usage()))
+    # Stay alive until every worker has reported so Pss is split correctly
+    ready.wait()
+
+
+def _run(ctx, workers):
+    queue, ready = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_warm_and_report, args=(queue, ready)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    pids = []
+    deadline = time.monotonic() + WARMUP_TIMEOUT
+    while len(pids) < len(procs):
+        try:
+            pids.append(queue.get(timeout=1.0)[0])
+        except queue_mod.Empty:
+            failed = [p.exitcode for p in procs if p.exitcode not in (None, 0)]
+            if failed or time.monotonic() > deadline:
+                for p in procs:
+                    p.kill()
+                raise SystemExit(f'worker warm-up failed (exit codes {failed})' if failed else
+                                 f'workers not warm after {WARMUP_TIMEOUT}s')
+    # Sample again once all workers are up so shared pages are accounted for
+    usage = [memory_usage(pid) for pid in pids]
+    ready.set()
+    for p in procs:
+        p.join()
+    return usage
+
+
+def _report(label, usage):
+    print(f'{label}:')
+    for i, u in enumerate(usage):
+        print(f"  worker {i}: rss={u.get('rss', 0)}kB pss={u.get('pss', 0)}kB private={u.get('private', 0)}kB")
+    print(f"  total pss={sum(u.get('pss', 0) for u in usage)}kB "
+          f"private={sum(u.get('private', 0) for u in usage)}kB")
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    os.environ['STARTUP_MODE'] = 'eager'
+    _report('independent', _run(mp.get_context('spawn'), workers))
+
+    os.environ['STARTUP_MODE'] = 'lazy'
+    import app
+    app.create_app()
+    _report('preload', _run(mp.get_context('fork'), workers))
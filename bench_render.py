@@ -0,0 +1,63 @@
+# Incident map render time and HTML size: one CircleMarker per row via
+# iterrows() versus a single GeoJSON layer.
+#   python bench_render.py [sizes...]   (default: 1000 100000)
+# The per-row path is skipped above LEGACY_MAX points unless --all is given.
+import sys
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+
+from map_layers import add_points_layer
+
+LEGACY_MAX = 20_000
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Latitude': rng.normal(40.74, 0.03, n),
+        'Longitude': rng.normal(-73.98, 0.03, n),
+        'CrimeType': rng.choice(['Assault', 'Robbery', 'Theft', 'Harassment'], n),
+    })
+
+
+def render_per_row(df):
+    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=12)
+    for _, row in df.iterrows():
+        folium.CircleMarker(
+            location=[row['Latitude'], row['Longitude']],
+            radius=5,
+            popup=row['CrimeType'],
+            fill=True,
+            color='red',
+            fill_opacity=0.7
+        ).add_to(map_)
+    return map_._repr_html_()
+
+
+def render_geojson(df):
+    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=12)
+    add_points_layer(map_, df, popup_field='CrimeType')
+    return map_._repr_html_()
+
+
+def measure(fn, df):
+    start = time.perf_counter()
+    html = fn(df)
+    return time.perf_counter() - start, len(html.encode())
+
+
+if __name__ == '__main__':
+    run_all = '--all' in sys.argv
+    sizes = [int(a) for a in sys.argv[1:] if a != '--all'] or [1000, 100_000]
+    print(f"{'points':>8} {'path':>9} {'seconds':>9} {'html MB':>9}")
+    for n in sizes:
+        df = synthetic(n)
+        paths = [('geojson', render_geojson)]
+        if run_all or n <= LEGACY_MAX:
+            paths.insert(0, ('per-row', render_per_row))
+        for name, fn in paths:
+            seconds, size = measure(fn, df)
+            print(f'{n:>8} {name:>9} {seconds:>9.3f} {size / 1e6:>9.2f}')
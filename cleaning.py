@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from analytics import parse_minutes
+
+# === Incident validation and cleaning ===
+# One pass over raw incident rows, run when data is loaded or ingested:
+# required columns present, numeric fields coerced, coordinates and severity
+# in range, text fields trimmed (times as zero-padded HH:MM), exact duplicates
+# dropped. Text columns come out as categoricals and the string work is done
+# once per distinct value, not per row. Everything downstream (training,
+# prediction, maps, risk) uses the cleaned frame as-is.
+INCIDENT_COLUMNS = ['Location', 'Time', 'CrimeType', 'Severity', 'Latitude', 'Longitude']
+TEXT_COLUMNS = ['Location', 'Time', 'CrimeType']
+
+CleanReport = namedtuple('CleanReport', ['rows_in', 'rows_out', 'missing', 'out_of_range', 'duplicates'])
+
+
+def _categorical(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.array
+    return pd.Categorical(values)
+
+
+def normalize_text(values, kind=None):
+    # Categorical with trimmed, whitespace-collapsed categories; blank or
+    # (for kind='time') unparseable values become missing
+    cat = _categorical(values)
+    names = pd.Series(cat.categories.astype(str)).str.strip().str.replace(r'\s+', ' ', regex=True)
+    if kind == 'time':
+        minutes = parse_minutes(names)
+        names = (minutes // 60).map('{:02.0f}'.format) + ':' + (minutes % 60).map('{:02.0f}'.format)
+        names = names.where(minutes.notna())
+    names = names.where(names != '')
+    codes, uniques = pd.factorize(names)
+    # code -1 (missing input) indexes the trailing -1
+    mapped = np.append(codes, -1)[cat.codes]
+    return pd.Categorical.from_codes(mapped, categories=uniques)
+
+
+def clean_incidents(df):
+    missing_columns = [c for c in INCIDENT_COLUMNS if c not in df.columns]
+    if missing_columns:
+        raise ValueError(f'Incident data is missing column(s): {missing_columns}')
+    text = {col: normalize_text(df[col], 'time' if col == 'Time' else None) for col in TEXT_COLUMNS}
+    severity = pd.to_numeric(df['Severity'], errors='coerce').to_numpy(dtype=float)
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=float)
+
+    missing = np.isnan(severity) | np.isnan(lat) | np.isnan(lon)
+    for values in text.values():
+        missing |= values.codes < 0
+    with np.errstate(invalid='ignore'):
+        out_of_range = ~missing & ((np.abs(lat) > 90) | (np.abs(lon) > 180) |
+                                   (severity < 0) | (severity != np.round(severity)))
+    keep = ~(missing | out_of_range)
+
+    clean = pd.DataFrame({
+        **{col: values[keep].remove_unused_categories() for col, values in text.items()},
+        'Severity': severity[keep].astype(np.int64),
+        'Latitude': lat[keep],
+        'Longitude': lon[keep],
+    })
+    duplicated = clean.duplicated().to_numpy()
+    if duplicated.any():
+        clean = clean[~duplicated].reset_index(drop=True)
+    report = CleanReport(len(df), len(clean), int(missing.sum()), int(out_of_range.sum()), int(duplicated.sum()))
+    return clean, report
+
+
+def concat_incidents(frames):
+    # Row-wise concat of cleaned frames keeping the text columns categorical
+    non_empty = [f for f in frames if len(f)]
+    if len(non_empty) <= 1:
+        return non_empty[0] if non_empty else frames[0]
+    frames = non_empty
+    columns = {}
+    for col in INCIDENT_COLUMNS:
+        if col in TEXT_COLUMNS:
+            columns[col] = union_categoricals([f[col] for f in frames])
+        else:
+            columns[col] = np.concatenate([f[col].to_numpy() for f in frames])
+    return pd.DataFrame(columns)
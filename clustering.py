@@ -0,0 +1,84 @@
+import numpy as np
+
+# === Zoom-level marker clustering ===
+# Incidents are projected to Web Mercator once and, for every zoom level below
+# INDIVIDUAL_ZOOM, grouped into square pixel cells of CLUSTER_RADIUS_PX. Cell
+# sizes halve with each zoom, so the levels nest into a hierarchy. A map
+# request gets the precomputed cluster summaries for its zoom and bounding
+# box; single incidents are only sent from INDIVIDUAL_ZOOM in.
+CLUSTER_RADIUS_PX = 60
+INDIVIDUAL_ZOOM = 15
+MAX_FEATURES = 5000
+
+
+def mercator(lat, lon):
+    # Normalised Web Mercator, x and y both in [0, 1)
+    lat = np.clip(np.asarray(lat, dtype=float), -85.05112878, 85.05112878)
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    s = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)
+    return x, y
+
+
+class ZoomClusters:
+
+    def __init__(self, lat, lon, severity=None, crime_type=None,
+                 radius_px=CLUSTER_RADIUS_PX, individual_zoom=INDIVIDUAL_ZOOM):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.severity = np.ones(len(self.lat)) if severity is None else np.asarray(severity, dtype=float)
+        self.crime_type = None if crime_type is None else np.asarray(crime_type, dtype=object)
+        self.individual_zoom = individual_zoom
+        x, y = mercator(self.lat, self.lon)
+        self.levels = [self._level(x, y, radius_px / (256.0 * 2 ** z)) for z in range(individual_zoom)]
+
+    def _level(self, x, y, cell):
+        keys = np.floor(x / cell).astype(np.int64) * (int(1 / cell) + 2) + np.floor(y / cell).astype(np.int64)
+        _, inverse, count = np.unique(keys, return_inverse=True, return_counts=True)
+        severity_max = np.zeros(len(count))
+        np.maximum.at(severity_max, inverse, self.severity)
+        return {
+            'lat': np.bincount(inverse, weights=self.lat) / count,
+            'lon': np.bincount(inverse, weights=self.lon) / count,
+            'count': count,
+            'severity_sum': np.bincount(inverse, weights=self.severity),
+            'severity_max': severity_max,
+        }
+
+    @staticmethod
+    def _in_bbox(lat, lon, bbox):
+        if bbox is None:
+            return np.ones(len(lat), dtype=bool)
+        south, west, north, east = bbox
+        inside_lon = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+        return (lat >= south) & (lat <= north) & inside_lon
+
+    def query(self, zoom, bbox=None, limit=MAX_FEATURES):
+        # GeoJSON FeatureCollection for one map view; bbox = (south, west, north, east)
+        zoom = int(zoom)
+        if zoom >= self.individual_zoom:
+            idx = np.flatnonzero(self._in_bbox(self.lat, self.lon, bbox))[:limit]
+            features = [
+                self._feature(self.lat[i], self.lon[i], {
+                    'count': 1, 'severity': float(self.severity[i]),
+                    'crime_type': None if self.crime_type is None else str(self.crime_type[i])})
+                for i in idx
+            ]
+        else:
+            level = self.levels[max(zoom, 0)]
+            idx = np.flatnonzero(self._in_bbox(level['lat'], level['lon'], bbox))
+            # Biggest clusters first if the view has to be truncated
+            idx = idx[np.argsort(level['count'][idx], kind='stable')[::-1]][:limit]
+            features = [
+                self._feature(level['lat'][i], level['lon'][i], {
+                    'count': int(level['count'][i]),
+                    'mean_severity': round(float(level['severity_sum'][i] / level['count'][i]), 2),
+                    'max_severity': float(level['severity_max'][i])})
+                for i in idx
+            ]
+        return {'type': 'FeatureCollection', 'zoom': zoom, 'features': features}
+
+    @staticmethod
+    def _feature(lat, lon, properties):
+        return {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [round(float(lon), 6), round(float(lat), 6)]},
+                'properties': properties}
@@ -0,0 +1,228 @@
+import os
+import sys
+from dataclasses import dataclass, field, fields
+
+# === Configuration ===
+# Settings are read once at import into `settings`. Each value is the
+# dataclass default below, then the [section] key from the config file
+# (SAFETY_CONFIG, default safety.toml, optional), then its environment
+# variable. The environment names are the ones the modules used to read
+# directly, so existing deployments keep working.
+# Settings with a fixed set of values are checked against it at load time.
+# `python config.py` prints the effective settings in file format.
+CONFIG_FILE = os.environ.get('SAFETY_CONFIG', 'safety.toml')
+
+
+def setting(default, env, choices=None):
+    return field(default=default, metadata={'env': env, 'choices': choices})
+
+
+@dataclass(frozen=True)
+class DataConfig:
+    crime_data: str = setting('crime_data.csv', 'CRIME_DATA')
+    past_crime_data: str = setting('past_crime_data.csv', 'PAST_CRIME_DATA')
+    current_crime_data: str = setting('current_crime_data.csv', 'CURRENT_CRIME_DATA')
+    gazetteer: str = setting('gazetteer.csv', 'GAZETTEER_FILE')
+    forecasts: str = setting('forecasts.csv', 'FORECAST_FILE')
+    users_db: str = setting('users.db', 'USERS_DB')
+    # Outputs of safe_heatmap.py and export_maps.py
+    safe_map: str = setting('safe_location_heatmap.html', 'SAFE_MAP_FILE')
+    export_dir: str = setting('exports', 'EXPORT_DIR')
+    # Persistent incident dedup keys; empty keeps them in memory only
+    dedup_db: str = setting('incident_keys.db', 'DEDUP_DB')
+    dedup_decimals: int = setting(4, 'DEDUP_DECIMALS')
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    # See core.py
+    startup_mode: str = setting('eager', 'STARTUP_MODE', ('eager', 'background', 'lazy'))
+    svm_kernel: str = setting('rbf', 'SVM_KERNEL', ('linear', 'poly', 'rbf', 'sigmoid'))
+    svm_c: float = setting(1.0, 'SVM_C')
+    kmeans_clusters: int = setting(5, 'KMEANS_CLUSTERS')
+    kmeans_n_init: int = setting(10, 'KMEANS_N_INIT')
+    # One model per region (see regions.py); off trains a single model
+    region_sharding: bool = setting(True, 'REGION_SHARDING')
+    region_radius_km: float = setting(50.0, 'REGION_RADIUS_KM')
+    # Grid cell size for incidents farther than that from any gazetteer place
+    region_grid_deg: float = setting(1.0, 'REGION_GRID_DEG')
+    # Processes fitting regions in parallel; 0 means one per CPU
+    train_workers: int = setting(0, 'TRAIN_WORKERS')
+    predict_batch_max: int = setting(32, 'PREDICT_BATCH_MAX')
+    # 0 turns micro-batching off
+    predict_batch_wait_ms: float = setting(2.0, 'PREDICT_BATCH_WAIT_MS')
+
+
+@dataclass(frozen=True)
+class MapConfig:
+    zoom_start: int = setting(12, 'MAP_ZOOM_START')
+    marker_radius: int = setting(5, 'MAP_MARKER_RADIUS')
+    marker_mode: str = setting('auto', 'MAP_MARKER_MODE', ('points', 'clusters', 'auto'))
+    cluster_min_points: int = setting(1000, 'CLUSTER_MIN_POINTS')
+    # Density cells are kde_cell_m square; kde_grid_size only caps the cells
+    # per side (a region wider than that gets coarser cells)
+    kde_cell_m: float = setting(100.0, 'KDE_CELL_M')
+    kde_grid_size: int = setting(1024, 'KDE_GRID_SIZE')
+    kde_bandwidth_m: float = setting(300.0, 'KDE_BANDWIDTH_M')
+
+
+@dataclass(frozen=True)
+class LiveConfig:
+    # Appends kept for reconnecting clients (see livefeed.py)
+    ring_size: int = setting(256, 'LIVE_RING_SIZE')
+    # Open streams per process. Under gunicorn's gthread workers each holds a
+    # thread, and gunicorn.conf.py caps this at a quarter of them.
+    max_clients: int = setting(8, 'LIVE_MAX_CLIENTS')
+    max_points: int = setting(500, 'LIVE_MAX_POINTS')
+    heartbeat: float = setting(15.0, 'LIVE_HEARTBEAT')
+    # Seconds before a stream is closed and the browser reconnects
+    max_age: float = setting(300.0, 'LIVE_MAX_AGE')
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    gazetteer_size: int = setting(4096, 'GAZETTEER_CACHE_SIZE')
+    # Empty means the accounts database (data.users_db)
+    session_db: str = setting('', 'SESSION_DB')
+    session_size: int = setting(10000, 'SESSION_CACHE_SIZE')
+    session_ttl: float = setting(30.0, 'SESSION_CACHE_TTL')
+    session_lifetime: float = setting(7 * 24 * 3600.0, 'SESSION_LIFETIME')
+    prediction_size: int = setting(10000, 'PREDICTION_CACHE_SIZE')
+    # Seconds between checks of crime_data.csv for changes made elsewhere
+    data_check_interval: float = setting(1.0, 'DATA_CHECK_INTERVAL')
+
+
+@dataclass(frozen=True)
+class WorkersConfig:
+    api_workers: int = setting(2, 'API_WORKERS')
+    api_max_pending: int = setting(64, 'API_MAX_PENDING')
+    api_max_batch: int = setting(1000, 'API_MAX_BATCH')
+    api_max_route_points: int = setting(10000, 'API_MAX_ROUTE_POINTS')
+
+
+@dataclass(frozen=True)
+class AuthConfig:
+    scrypt_n: int = setting(2 ** 14, 'PASSWORD_SCRYPT_N')
+    login_rate_limit: bool = setting(True, 'LOGIN_RATE_LIMIT')
+    # Empty keeps the login buckets in process memory
+    rate_limit_db: str = setting('', 'RATE_LIMIT_DB')
+    login_ip_burst: float = setting(20.0, 'LOGIN_IP_BURST')
+    login_ip_per_minute: float = setting(10.0, 'LOGIN_IP_PER_MINUTE')
+    login_user_burst: float = setting(5.0, 'LOGIN_USER_BURST')
+    login_user_per_minute: float = setting(5.0, 'LOGIN_USER_PER_MINUTE')
+    # Reverse proxies in front of the app. Their X-Forwarded-* headers give
+    # the client address the login buckets key on; 0 trusts no header.
+    proxy_count: int = setting(0, 'PROXY_COUNT')
+    # Who may POST /api/incidents: these accounts, or clients sending one of
+    # the keys as X-API-Key. Both empty turns ingestion off.
+    ingest_users: tuple = setting((), 'INGEST_USERS')
+    ingest_api_keys: tuple = setting((), 'INGEST_API_KEYS')
+
+
+@dataclass(frozen=True)
+class ProfilingConfig:
+    dir: str = setting('profiles', 'PROFILE_DIR')
+    sample_rate: float = setting(0.0, 'PROFILE_SAMPLE_RATE')
+    keep: int = setting(50, 'PROFILE_KEEP')
+    admins: tuple = setting((), 'PROFILE_ADMINS')
+
+
+@dataclass(frozen=True)
+class Settings:
+    data: DataConfig
+    model: ModelConfig
+    map: MapConfig
+    live: LiveConfig
+    cache: CacheConfig
+    workers: WorkersConfig
+    auth: AuthConfig
+    profiling: ProfilingConfig
+
+
+def _coerce(kind, value, where, choices=None):
+    value = _convert(kind, value, where)
+    if choices and value not in choices:
+        raise ValueError(f'{where}: expected one of {", ".join(choices)}, got {value!r}')
+    return value
+
+
+def _convert(kind, value, where):
+    try:
+        if kind is bool:
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text in ('1', 'true', 'yes', 'on'):
+                return True
+            if text in ('0', 'false', 'no', 'off', ''):
+                return False
+            raise ValueError(value)
+        if kind is tuple:
+            if isinstance(value, str):
+                value = value.split(',')
+            return tuple(str(v).strip() for v in value if str(v).strip())
+        if kind is int and isinstance(value, float) and not value.is_integer():
+            raise ValueError(value)
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{where}: expected {kind.__name__}, got {value!r}') from None
+
+
+def _read_file(path):
+    if not path or not os.path.exists(path):
+        return {}
+    import tomllib
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+
+def load_config(path=CONFIG_FILE, environ=os.environ):
+    raw = _read_file(path)
+    sections = {f.name: f.type for f in fields(Settings)}
+    unknown = set(raw) - set(sections)
+    if unknown:
+        raise ValueError(f'{path}: unknown section(s) {sorted(unknown)}')
+    built = {}
+    for name, cls in sections.items():
+        values = raw.get(name, {})
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f'{path}: unknown key(s) in [{name}]: {sorted(unknown)}')
+        kwargs = {}
+        for f in fields(cls):
+            env = f.metadata['env']
+            choices = f.metadata['choices']
+            if env in environ:
+                kwargs[f.name] = _coerce(f.type, environ[env], env, choices)
+            elif f.name in values:
+                kwargs[f.name] = _coerce(f.type, values[f.name], f'{path} [{name}] {f.name}', choices)
+        built[name] = cls(**kwargs)
+    return Settings(**built)
+
+
+def _toml_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    if isinstance(value, tuple):
+        return '[' + ', '.join(_toml_value(v) for v in value) + ']'
+    return repr(value)
+
+
+def dump(config):
+    lines = []
+    for section in fields(config):
+        lines.append(f'[{section.name}]')
+        values = getattr(config, section.name)
+        for f in fields(values):
+            lines.append(f'{f.name} = {_toml_value(getattr(values, f.name))}  # {f.metadata["env"]}')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+settings = load_config()
+
+if __name__ == '__main__':
+    sys.stdout.write(dump(settings))
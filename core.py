@@ -0,0 +1,524 @@
+import os
+import threading
+
+from flask import has_request_context, url_for
+
+from batching import MicroBatcher
+from config import settings
+from dataset import DatasetVersion, Epoch, EpochLRU, VersionedCache
+from livefeed import Broadcaster, append_payload
+
+# === Shared core ===
+# Dataset, fitted models and the query/map engine behind every front end.
+# app.py serves all the UIs (see pr.py and final.py) as blueprints on one
+# Flask app, so a process holds a single copy of the data and models.
+
+# === Load Data and Train Models ===
+# pandas, scikit-learn and folium are imported on first use so the landing and
+# auth pages come up without waiting for them.
+# STARTUP_MODE: 'eager' trains at import (default), 'background' warms the
+# models in a thread right after startup, 'lazy' waits for the first request
+# to /dashboard or /heatmap. /ready reports when the models are usable.
+STARTUP_MODE = settings.model.startup_mode
+
+crime_data = None
+crime_data_report = None
+_dedup = None
+_csv_columns = None
+
+# data_version moves whenever crime_data changes (ingestion here, or the
+# file changing on disk); model_version whenever the models are refit.
+# Caches below are tied to one of them (see dataset.py).
+data_version = DatasetVersion(settings.data.crime_data, settings.cache.data_check_interval)
+model_version = Epoch()
+
+# Fitted models per region (see regions.py); predictions for a location
+# with no model of its own go to default_region, the one with most incidents
+region_models = {}
+default_region = None
+
+_models_lock = threading.Lock()
+_models_ready = threading.Event()
+_models_error = None
+
+# REGION_SHARDING=0 puts every incident in one region, i.e. a single model
+_region_index = None
+
+def point_regions(lat, lon):
+    import numpy as np
+    global _region_index
+    if not settings.model.region_sharding:
+        return np.full(len(lat), 'all', dtype=object)
+    if _region_index is None:
+        from regions import RegionIndex
+        _region_index = RegionIndex(get_gazetteer().places, settings.model.region_radius_km, settings.model.region_grid_deg)
+    return _region_index.assign(lat, lon)
+
+def row_regions(df):
+    return point_regions(df['Latitude'], df['Longitude'])
+
+def region_groups(df):
+    # {region: row positions} for df
+    import pandas as pd
+    regions = row_regions(df)
+    return pd.Series(regions).groupby(regions, sort=True).indices
+
+def train_models(only_new=False):
+    # Fits the regions whose incidents changed (only_new: regions with no
+    # model yet); the rest keep their models
+    global region_models, default_region
+    from regions import train_regions
+    m = settings.model
+    # crime_data is already cleaned (see cleaning.py), so it's used as-is
+    models = train_regions(crime_data, row_regions(crime_data), region_models, workers=m.train_workers,
+                           only_new=only_new, svm_kernel=m.svm_kernel, svm_c=m.svm_c,
+                           kmeans_clusters=m.kmeans_clusters, kmeans_n_init=m.kmeans_n_init)
+    if models.keys() == region_models.keys() and all(models[r] is region_models[r] for r in models):
+        return
+    region_models = models
+    default_region = max(models.values(), key=lambda model: model.rows).region
+    model_version.bump()
+
+def _load_dataset():
+    global crime_data, crime_data_report, _dedup, _csv_columns
+    import pandas as pd
+    from cleaning import clean_incidents
+    from dedup import DedupIndex
+    raw = pd.read_csv(data_version.read_all())
+    _csv_columns = list(raw.columns)
+    crime_data, crime_data_report = clean_incidents(raw)
+    # Near-duplicates already in the file count once
+    if _dedup is None:
+        _dedup = DedupIndex()
+    keep = _dedup.seed(crime_data)
+    if not keep.all():
+        crime_data = crime_data[keep].reset_index(drop=True)
+
+def _fold_appended():
+    # Reads the rows appended to the file since it was last read (by this or
+    # another worker) into crime_data. Caller holds _ingest_lock.
+    global crime_data
+    import pandas as pd
+    from cleaning import clean_incidents, concat_incidents
+    appended = data_version.read_appended()
+    if not appended.getbuffer().nbytes:
+        # Only a partly written line so far
+        return crime_data.iloc[:0]
+    new, _ = clean_incidents(pd.read_csv(appended, header=None, names=_csv_columns))
+    new = new[_dedup.seed(new)]
+    if len(new):
+        crime_data = concat_incidents([crime_data, new])
+        # A city seen for the first time gets its model now; the models of
+        # regions that just grew are not refit
+        if set(row_regions(new)) - region_models.keys():
+            train_models(only_new=True)
+        data_version.bump('append', new)
+    return new
+
+def sync_dataset():
+    # Picks up changes made to crime_data.csv outside this process; returns
+    # the data epoch. Costs a clock read unless a disk check is due.
+    load_models()
+    if data_version.changed() is not None:
+        with _ingest_lock:
+            kind = data_version.changed(force=True)
+            if kind == 'append':
+                _fold_appended()
+            elif kind == 'reload':
+                _load_dataset()
+                train_models()
+                data_version.bump('reload', crime_data)
+    return data_version.epoch
+
+def dataset_tag():
+    # data_version.tag after picking up any pending changes (used as ETag)
+    sync_dataset()
+    with _ingest_lock:
+        return data_version.tag
+
+def load_models():
+    global _models_error
+    if _models_ready.is_set():
+        return
+    with _models_lock:
+        if _models_ready.is_set():
+            return
+        try:
+            _load_dataset()
+            live_feed.reset(data_version.offset)
+            train_models()
+            # Warm the mapping stack too so the first /heatmap doesn't pay for it
+            import folium  # noqa: F401
+        except Exception as e:
+            _models_error = repr(e)
+            raise
+        _models_error = None
+        _models_ready.set()
+
+def model_status():
+    return _models_ready.is_set(), _models_error
+
+# New incidents are pushed to open maps over /api/live (see livefeed.py)
+live_feed = Broadcaster(settings.live.ring_size, poll=sync_dataset, poll_interval=settings.cache.data_check_interval)
+
+def _publish_live(epoch, kind, rows):
+    if kind == 'append':
+        live_feed.publish(data_version.offset, 'incidents', append_payload(rows, max_points=settings.live.max_points))
+    else:
+        live_feed.reset(data_version.offset)
+
+data_version.subscribe(_publish_live)
+
+def live_stream(after=None):
+    sync_dataset()
+    return live_feed.stream(after, heartbeat=settings.live.heartbeat, max_age=settings.live.max_age)
+
+# Free-text locations are resolved to canonical gazetteer names (and
+# coordinates) before encoding, so "Chennai ", "chennai central" and "Madras"
+# all predict as Chennai.
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        from gazetteer import Gazetteer
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load(settings.data.gazetteer, cache_size=settings.cache.gazetteer_size)
+    return _gazetteer
+
+def resolve_location(text):
+    return get_gazetteer().resolve(text)
+
+def canonical_location(text):
+    place = resolve_location(text)
+    return place.name if place else text
+
+# Recent predictions, dropped whenever the models are refit
+_predictions = EpochLRU(model_version, settings.cache.prediction_size)
+
+def location_region(text):
+    # The region whose model answers for a free-text location
+    if not settings.model.region_sharding:
+        return 'all'
+    place = resolve_location(text)
+    return place.region if place and place.region in region_models else default_region
+
+def predict_batch(rows):
+    # rows: iterable of (location, time, crime_type); cached rows are
+    # answered directly, the rest go through one encode + predict per region
+    import pandas as pd
+    from regions import encode_features
+    load_models()
+    epoch = model_version.epoch
+    models, default = region_models, default_region
+    rows = [(canonical_location(location), time, crime_type) for location, time, crime_type in rows]
+    results = [_predictions.get(row) for row in rows]
+    by_region = {}
+    for i, r in enumerate(results):
+        if r is None:
+            region = location_region(rows[i][0])
+            by_region.setdefault(region if region in models else default, []).append(i)
+    for region, missing in by_region.items():
+        model = models[region]
+        df = pd.DataFrame([rows[i] for i in missing], columns=['Location', 'Time', 'CrimeType'])
+        for i, p in zip(missing, model.svm.predict(encode_features(df, model.encoders))):
+            results[i] = int(p)
+            _predictions.put(rows[i], results[i], epoch)
+    return results
+
+# Concurrent single predictions are coalesced into one predict_batch() call.
+# PREDICT_BATCH_WAIT_MS=0 turns this off and predicts each call on its own.
+PREDICT_BATCH_MAX = settings.model.predict_batch_max
+PREDICT_BATCH_WAIT_MS = settings.model.predict_batch_wait_ms
+prediction_batcher = MicroBatcher(predict_batch, max_batch=PREDICT_BATCH_MAX, max_wait_ms=PREDICT_BATCH_WAIT_MS)
+
+def predict_severity(location, time, crime_type):
+    if PREDICT_BATCH_WAIT_MS <= 0:
+        return predict_batch([(location, time, crime_type)])[0]
+    return prediction_batcher((location, time, crime_type))
+
+def predict_crime(location, time, crime_type):
+    prediction = predict_severity(location, time, crime_type)
+    return f"Predicted Crime Severity: {prediction}"
+
+def nearby_incidents(lat, lon, radius_km=1.0, limit=50):
+    import numpy as np
+    sync_dataset()
+    df = crime_data
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(df['Latitude'].to_numpy()), np.radians(df['Longitude'].to_numpy())
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    dist_km = 6371.0 * 2 * np.arcsin(np.sqrt(a))
+    idx = np.flatnonzero(dist_km <= radius_km)
+    idx = idx[np.argsort(dist_km[idx], kind='stable')][:limit]
+    return [
+        {'location': df['Location'].iat[i], 'time': df['Time'].iat[i], 'crime_type': df['CrimeType'].iat[i],
+         'severity': int(df['Severity'].iat[i]), 'latitude': float(df['Latitude'].iat[i]),
+         'longitude': float(df['Longitude'].iat[i]), 'distance_km': round(float(dist_km[i]), 3)}
+        for i in idx
+    ]
+
+def _hotspot_summary():
+    # Each region's KMeans clusters over that region's incidents
+    import numpy as np
+    df = crime_data
+    summary = []
+    for region, idx in region_groups(df).items():
+        model = region_models.get(region)
+        if model is None:
+            continue
+        centers = model.kmeans.cluster_centers_
+        labels = model.kmeans.predict(df[['Latitude', 'Longitude']].iloc[idx])
+        counts = np.bincount(labels, minlength=len(centers))
+        severity_sum = np.bincount(labels, weights=df['Severity'].to_numpy()[idx], minlength=len(counts))
+        summary += [
+            {'region': region, 'cluster': i, 'latitude': float(center[0]), 'longitude': float(center[1]),
+             'incidents': int(counts[i]), 'mean_severity': round(float(severity_sum[i] / counts[i]), 2) if counts[i] else None}
+            for i, center in enumerate(centers)
+        ]
+    return summary
+
+_hotspots = VersionedCache(data_version, _hotspot_summary)
+
+def hotspot_summary():
+    sync_dataset()
+    return _hotspots.get()
+
+# Past vs current trend analytics, built on first use per grouping
+_analytics = {}
+_analytics_lock = threading.Lock()
+
+def get_analytics(by='location'):
+    from analytics import HotspotAnalytics
+    with _analytics_lock:
+        if by not in _analytics:
+            _analytics[by] = HotspotAnalytics.from_files(
+                settings.data.past_crime_data, settings.data.current_crime_data, by=by)
+        return _analytics[by]
+
+def trend_report(start_minute, hours, by='location', emerging_only=False):
+    import numpy as np
+    engine = get_analytics(by)
+    rates = engine.emerging_hotspots(start_minute, hours) if emerging_only else engine.window_rates(start_minute, hours)
+    return [
+        {by: key, 'past_rate': round(float(r.past_rate), 3), 'current_rate': round(float(r.current_rate), 3),
+         'change': round(float(r.change), 3), 'ratio': None if np.isinf(r.ratio) else round(float(r.ratio), 3),
+         'emerging': bool(r.emerging)}
+        for key, r in zip(rates.index, rates.itertuples())
+    ]
+
+# Forecasts are precomputed by `python forecasting.py`; if the file is
+# missing they are built once here and kept for the life of the process.
+_forecasts = None
+
+def get_forecasts():
+    global _forecasts
+    from forecasting import FORECAST_FILE, ForecastTable, build_forecasts, load_periods
+    with _analytics_lock:
+        if _forecasts is None:
+            if os.path.exists(FORECAST_FILE):
+                _forecasts = ForecastTable.load(FORECAST_FILE)
+            else:
+                _forecasts = build_forecasts(load_periods())
+        return _forecasts
+
+def forecast_lookup(location, crime_type=None):
+    return get_forecasts().lookup(location, crime_type)
+
+# Severity-weighted KDE surfaces, one per region with KDE_CELL_M cells,
+# rebuilt when the incidents change. One grid stretched over every city
+# would have cells tens of kilometres wide against a 300 m bandwidth.
+def _build_density():
+    from kde import build_surface
+    df = crime_data
+    lat, lon, severity = df['Latitude'].to_numpy(), df['Longitude'].to_numpy(), df['Severity'].to_numpy()
+    m = settings.map
+    return {region: build_surface(lat[idx], lon[idx], severity[idx], grid_size=m.kde_grid_size,
+                                  bandwidth_m=m.kde_bandwidth_m, cell_m=m.kde_cell_m)
+            for region, idx in region_groups(df).items()}
+
+_density = VersionedCache(data_version, _build_density)
+
+def get_surfaces():
+    sync_dataset()
+    return _density.get()
+
+def get_density(region=None):
+    # One region's surface; default_region's if region is None or has no data
+    surfaces = get_surfaces()
+    return surfaces.get(region) or surfaces.get(default_region) or next(iter(surfaces.values()))
+
+def density_peaks(n=10):
+    # The strongest peaks over all regions (densities are per km², so comparable)
+    peaks = [dict(p, region=region) for region, surface in get_surfaces().items() for p in surface.peaks(n)]
+    return sorted(peaks, key=lambda p: p['density'], reverse=True)[:n]
+
+def route_risk(points, spacing_m=25.0):
+    # Scored on the surface of the region the route is in
+    import numpy as np
+    from route import score_route
+    points = np.asarray(points, dtype=float)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError('A route is a list of [lat, lon] points')
+    regions = set(point_regions(points[:, 0], points[:, 1]))
+    if len(regions) > 1:
+        raise ValueError(f'The route crosses regions ({", ".join(sorted(regions))}); score each part separately.')
+    region = regions.pop()
+    surface = get_surfaces().get(region)
+    if surface is None:
+        raise ValueError(f'No incident data for {region}.')
+    return dict(score_route(surface, points, spacing_m), region=region)
+
+# Per-location risk scores for the dashboard. New rows are folded in as they
+# arrive; only a reload of the file rebuilds the table.
+_risk_table = None
+
+def _update_risk_table(epoch, kind, rows):
+    global _risk_table
+    from risk import RiskTable
+    with _analytics_lock:
+        if _risk_table is None:
+            return
+        if kind == 'append':
+            _risk_table.ingest(rows)
+        else:
+            _risk_table = RiskTable(rows)
+
+data_version.subscribe(_update_risk_table)
+
+def get_risk_table():
+    global _risk_table
+    from risk import RiskTable
+    sync_dataset()
+    with _analytics_lock:
+        if _risk_table is None:
+            _risk_table = RiskTable(crime_data)
+        return _risk_table
+
+def risk_page(page=1, per_page=20):
+    return get_risk_table().page(page, per_page)
+
+# === Ingestion ===
+_ingest_lock = threading.Lock()
+
+def ingest_incidents(records):
+    # records: list of dicts keyed by INCIDENT_COLUMNS. Rows that fail
+    # clean_incidents() or repeat a known incident (see dedup.py) are
+    # dropped. New incidents are appended (already clean) to crime_data.csv,
+    # then read back with anything other workers appended, which moves
+    # data_version; only regions seen for the first time get models here.
+    import pandas as pd
+    from cleaning import INCIDENT_COLUMNS, clean_incidents
+    sync_dataset()
+    new, _ = clean_incidents(pd.DataFrame.from_records(records).reindex(columns=INCIDENT_COLUMNS))
+    if not len(new):
+        return 0
+    with _ingest_lock:
+        fresh = _dedup.filter_new(new)
+        if not fresh.any():
+            return 0
+        new = new[fresh]
+        data_version.append(new.reindex(columns=_csv_columns).to_csv(
+            header=False, index=False, lineterminator='\r\n').encode())
+        _fold_appended()
+    return len(new)
+
+# Precomputed per-zoom clusters served to the map by /api/clusters. These
+# stay global: the grid is in Web Mercator pixels at each zoom, so a cell is
+# the same size in every city, and the map only asks for its own bbox.
+def _build_clusters():
+    from clustering import ZoomClusters
+    df = crime_data
+    return ZoomClusters(df['Latitude'], df['Longitude'], df['Severity'], df['CrimeType'])
+
+_clusters = VersionedCache(data_version, _build_clusters)
+
+def get_clusters():
+    sync_dataset()
+    return _clusters.get()
+
+def cluster_query(zoom, bbox=None):
+    return get_clusters().query(zoom, bbox)
+
+# MAP_MARKER_MODE: 'points' embeds every incident in the map, 'clusters' has
+# the map fetch per-zoom clusters from /api/clusters, and 'auto' (default)
+# switches to clusters above CLUSTER_MIN_POINTS incidents.
+MAP_MARKER_MODE = settings.map.marker_mode
+CLUSTER_MIN_POINTS = settings.map.cluster_min_points
+
+# Rendered map HTML per region, reused until the incidents change
+_heatmaps = EpochLRU(data_version, maxsize=8)
+
+def heatmap_regions():
+    # Regions with incidents, most incidents first
+    surfaces = get_surfaces()
+    return sorted(surfaces, key=lambda region: -int(surfaces[region].counts.sum()))
+
+def generate_heatmap(region=None):
+    # The map covers one region (default_region, or the largest, if region
+    # is None or has no incidents) and opens on its incidents
+    from map_layers import ClusterLayer, hotspot_map
+    regions = heatmap_regions()
+    if region not in regions:
+        region = default_region if default_region in regions else regions[0]
+    surface = get_density(region)
+    # The page picks up the live feed at the offset it was rendered from
+    with _ingest_lock:
+        epoch, offset, df = data_version.epoch, data_version.offset, crime_data
+    # The cluster and live layers call back into the API, so they need a
+    # request to build URLs from; without one (scripts, benches) the map
+    # embeds its points and has no live feed
+    in_request = has_request_context()
+    clustered = in_request and (MAP_MARKER_MODE == 'clusters' or
+                                (MAP_MARKER_MODE == 'auto' and surface.counts.sum() > CLUSTER_MIN_POINTS))
+    key = (region, url_for('api.clusters') if clustered else None, in_request)
+    html = _heatmaps.get(key)
+    if html is None:
+        df = df.iloc[region_groups(df)[region]]
+        map_ = hotspot_map(df, surface, points=not clustered,
+                           zoom_start=settings.map.zoom_start, marker_radius=settings.map.marker_radius,
+                           live_url=url_for('api.live', after=offset) if in_request else None)
+        if clustered:
+            map_.add_child(ClusterLayer(key[1]))
+        html = map_._repr_html_()
+        _heatmaps.put(key, html, epoch)
+    return html
+
+def cache_stats():
+    return {'dataset_epoch': data_version.epoch, 'model_epoch': model_version.epoch,
+            'predictions': _predictions.stats(), 'heatmaps': _heatmaps.stats(),
+            'rebuilds': {'density': _density.builds, 'clusters': _clusters.builds, 'hotspots': _hotspots.builds}}
+
+def _readonly(arr):
+    import numpy as np
+    arr = np.ascontiguousarray(arr)
+    arr.flags.writeable = False
+    return arr
+
+def freeze_snapshot():
+    # Called in the master before forking: numeric data and fitted model
+    # arrays become contiguous read-only buffers, and gc.freeze() keeps the
+    # collector from touching (and so copying) the preloaded objects in workers.
+    global crime_data
+    import gc
+    import numpy as np
+    import pandas as pd
+    columns = {}
+    for col in crime_data.columns:
+        values = crime_data[col].to_numpy()
+        # Text columns stay categorical (small code arrays)
+        columns[col] = _readonly(values) if values.dtype.kind in 'fiu' else crime_data[col]
+    crime_data = pd.DataFrame(columns, copy=False)
+    for model in [m for region in region_models.values() for m in (region.svm, region.kmeans)]:
+        for name, value in list(vars(model).items()):
+            if isinstance(value, np.ndarray) and value.dtype != object:
+                setattr(model, name, _readonly(value))
+    gc.collect()
+    gc.freeze()
+
+if STARTUP_MODE == 'eager':
+    load_models()
+elif STARTUP_MODE == 'background':
+    threading.Thread(target=load_models, name='model-warmup', daemon=True).start()
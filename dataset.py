@@ -0,0 +1,185 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# === Dataset versioning ===
+# DatasetVersion keeps an epoch counter for one append-only CSV. The epoch
+# moves when this process ingests rows, and when the file changes on disk
+# (another worker appended, or someone edited it). Derived data is tied to
+# the epoch: VersionedCache and EpochLRU rebuild only after it moves, and
+# subscribers get each change as it happens.
+#
+# Changes are classified as 'append' or 'reload'. 'append' means only new
+# complete lines past the last read offset, so only those bytes are parsed.
+# 'reload' means the file shrank, was replaced, or its last read bytes no
+# longer match. The disk is checked at most every check_interval seconds, so
+# the per-request cost is one clock read.
+TAIL_BYTES = 4096
+
+
+class Epoch:
+
+    def __init__(self):
+        self.epoch = 0
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        # callback(epoch, kind, rows); for a dataset kind is 'append' (rows =
+        # the new rows) or 'reload' (rows = the whole reloaded frame)
+        self._subscribers.append(callback)
+
+    def bump(self, kind=None, rows=None):
+        self.epoch += 1
+        for callback in list(self._subscribers):
+            callback(self.epoch, kind, rows)
+        return self.epoch
+
+
+class DatasetVersion(Epoch):
+
+    def __init__(self, path, check_interval=1.0):
+        super().__init__()
+        self.path = path
+        self.check_interval = check_interval
+        self.offset = 0
+        self._inode = None
+        self._mtime = None
+        self._tail = b''
+        self._checked = 0.0
+
+    def _digest(self, f, end):
+        f.seek(max(0, end - TAIL_BYTES))
+        return hashlib.blake2b(f.read(min(end, TAIL_BYTES)), digest_size=16).digest()
+
+    def _mark(self, f, offset):
+        st = os.fstat(f.fileno())
+        self.offset = offset
+        self._inode = st.st_ino
+        self._mtime = st.st_mtime_ns
+        self._tail = self._digest(f, offset)
+
+    @property
+    def tag(self):
+        # What has been read: same file, same length, same last bytes. Unlike
+        # the epoch, every process (and a restarted one) agrees on it.
+        return f'{self._inode:x}-{self.offset:x}-{self._tail.hex()[:16]}'
+
+    def read_all(self):
+        # Whole file, including a last line with no newline after it (appends
+        # go through append(), which terminates that line first); marks it as read
+        with open(self.path, 'rb') as f:
+            data = f.read()
+            self._mark(f, len(data))
+        return io.BytesIO(data)
+
+    def append(self, data):
+        # Appends whole lines in one write(), so other processes never read
+        # half a row. If the file doesn't end with a newline, one goes first;
+        # the blank line that leaves when two writers both add it is skipped
+        # by the CSV reader.
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                data = b'\r\n' + data
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+
+    def changed(self, force=False):
+        # None, 'append' or 'reload' compared with what was last read
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return None
+        self._checked = now
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        if st.st_ino == self._inode and st.st_mtime_ns == self._mtime:
+            return None
+        if st.st_ino != self._inode or st.st_size < self.offset:
+            return 'reload'
+        with open(self.path, 'rb') as f:
+            if self._digest(f, self.offset) != self._tail:
+                return 'reload'
+        if st.st_size > self.offset:
+            return 'append'
+        # Touched but unchanged
+        self._mtime = st.st_mtime_ns
+        return None
+
+    def read_appended(self):
+        # Complete lines written after the last read offset (no header)
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            self._mark(f, self.offset + end)
+        return io.BytesIO(data[:end])
+
+
+class VersionedCache:
+    # One value derived from the dataset, rebuilt on first use after the
+    # epoch moves
+
+    def __init__(self, version, build):
+        self.version = version
+        self.build = build
+        self.builds = 0
+        self._epoch = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._epoch == self.version.epoch:
+            return self._value
+        with self._lock:
+            epoch = self.version.epoch
+            if self._epoch != epoch:
+                self._value = self.build()
+                self._epoch = epoch
+                self.builds += 1
+            return self._value
+
+
+class EpochLRU:
+    # Keyed LRU whose entries only count for the epoch they were made in
+
+    def __init__(self, version, maxsize=128):
+        self.version = version
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._epoch = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if self._epoch != self.version.epoch or key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value, epoch):
+        # epoch: the version the value was computed from; stale puts are dropped
+        with self._lock:
+            if epoch != self.version.epoch:
+                return
+            if self._epoch != epoch:
+                self._entries.clear()
+                self._epoch = epoch
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
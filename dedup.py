@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from config import settings
+
+# === Incident dedup index ===
+# An incident's identity is a 64-bit hash of (Location, Time, CrimeType,
+# latitude and longitude rounded to DEDUP_DECIMALS places, ~11 m at 4).
+# Text is compared case-insensitively. Seen keys live in a Python set. With
+# DEDUP_DB set, they are also kept in an SQLite table whose primary key is
+# the hash. That table is the shared record across workers and restarts.
+# Keys the set already knows are rejected without touching SQLite. The rest
+# are checked and inserted in one IMMEDIATE transaction per batch, so two
+# workers can't both accept the same incident. All of this is linear in the
+# batch size; nothing rescans crime_data.csv.
+DEDUP_DB = settings.data.dedup_db
+DEDUP_DECIMALS = settings.data.dedup_decimals
+
+KEY_COLUMNS = ['Location', 'Time', 'CrimeType']
+
+
+def _folded(values):
+    # Lower-cased categorical, folding done once per category
+    cat = values.array if isinstance(values.dtype, pd.CategoricalDtype) else pd.Categorical(values.astype(str))
+    codes, uniques = pd.factorize(cat.categories.astype(str).str.lower())
+    return pd.Categorical.from_codes(np.append(codes, -1)[cat.codes], categories=uniques)
+
+
+def incident_keys(df, decimals=DEDUP_DECIMALS):
+    # Adding 0.0 turns -0.0 into 0.0 so both round to the same key
+    key = pd.DataFrame({col: _folded(df[col]) for col in KEY_COLUMNS})
+    key['Latitude'] = np.round(df['Latitude'].to_numpy(dtype=float), decimals) + 0.0
+    key['Longitude'] = np.round(df['Longitude'].to_numpy(dtype=float), decimals) + 0.0
+    return hash_pandas_object(key, index=False).to_numpy()
+
+
+class DedupIndex:
+
+    def __init__(self, db_path=DEDUP_DB or None, decimals=DEDUP_DECIMALS):
+        self.db_path = db_path
+        self.decimals = decimals
+        self.duplicates = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        if db_path:
+            with closing(sqlite3.connect(db_path, timeout=30, isolation_level=None)) as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('CREATE TABLE IF NOT EXISTS incident_keys (key INTEGER PRIMARY KEY)')
+                # SQLite integers are signed, so keys are stored as int64 bit patterns
+                stored = np.fromiter((r[0] for r in conn.execute('SELECT key FROM incident_keys')), dtype=np.int64)
+            self._seen.update(stored.view(np.uint64).tolist())
+
+    def _connection(self):
+        # One long-lived connection per process (used under self._lock) so
+        # SQLite's page cache stays warm between batches. It is opened on
+        # first write, never in the preloading master: a connection must not
+        # be used on both sides of fork().
+        if self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA cache_size=-65536')
+            conn.execute('CREATE TEMP TABLE batch_keys (key INTEGER PRIMARY KEY)')
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def __len__(self):
+        return len(self._seen)
+
+    def _unseen(self, keys):
+        seen = self._seen
+        return ~np.fromiter((k in seen for k in keys.tolist()), dtype=bool, count=len(keys))
+
+    def seed(self, df):
+        # Registers data that is already stored (crime_data.csv at startup).
+        # Returns the rows to keep: the first row of every key.
+        keys = incident_keys(df, self.decimals)
+        keep = ~pd.Series(keys).duplicated().to_numpy()
+        with self._lock:
+            new = keys[keep & self._unseen(keys)]
+            if self.db_path and len(new):
+                # At startup, possibly in the master, so on a short-lived connection
+                with closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None)) as conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.executemany('INSERT OR IGNORE INTO incident_keys (key) VALUES (?)',
+                                     ((k,) for k in new.view(np.int64).tolist()))
+                    conn.execute('COMMIT')
+            self._seen.update(new.tolist())
+        return keep
+
+    def filter_new(self, df):
+        # Mask of incidents not seen before (first occurrence within the batch);
+        # their keys are recorded
+        keys = incident_keys(df, self.decimals)
+        first = ~pd.Series(keys).duplicated().to_numpy()
+        with self._lock:
+            fresh = first & self._unseen(keys)
+            if self.db_path and fresh.any():
+                fresh = self._claim(keys, fresh)
+            self._seen.update(keys[fresh].tolist())
+        self.duplicates += int(len(keys) - fresh.sum())
+        return fresh
+
+    def _claim(self, keys, fresh):
+        # Inserts the candidate keys; ones another worker stored first are dropped
+        candidates = keys[fresh]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM batch_keys')
+            conn.executemany('INSERT INTO batch_keys (key) VALUES (?)', ((k,) for k in candidates.view(np.int64).tolist()))
+            taken = np.fromiter(
+                (r[0] for r in conn.execute('SELECT b.key FROM batch_keys b JOIN incident_keys k ON k.key = b.key')),
+                dtype=np.int64)
+            conn.execute('INSERT OR IGNORE INTO incident_keys (key) SELECT key FROM batch_keys')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if len(taken):
+            self._seen.update(taken.view(np.uint64).tolist())
+            fresh = fresh.copy()
+            fresh[np.flatnonzero(fresh)[np.isin(candidates, taken.view(np.uint64))]] = False
+        return fresh
+
+    def stats(self):
+        return {'keys': len(self._seen), 'duplicates_rejected': self.duplicates}
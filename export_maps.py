@@ -0,0 +1,119 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cleaning import clean_incidents, concat_incidents
+from config import settings
+from dedup import DedupIndex
+from gazetteer import normalize
+from kde import build_surface
+from map_layers import hotspot_map, points_to_geojson
+from regions import assign_regions
+from safe_heatmap import find_safe_zones, render_safe_map
+
+# === Static map export ===
+# Renders a hotspot map and a safe-zone map (HTML + GeoJSON) for every region
+# in the data, one region per worker process, into a versioned directory:
+#
+#   exports/<version>/manifest.json
+#   exports/<version>/<region>/{hotspots.html, hotspots.geojson,
+#                               incidents.geojson, safe_zones.html}
+#   exports/latest.json    -> {"version": ...}, swapped in once all regions are written
+#
+# The bundles are plain files, so they can be served from disk or a CDN.
+# Rows are cleaned, deduplicated and split into regions by coordinates the
+# same way core does it, so the exported maps match the served ones.
+EXPORT_DIR = settings.data.export_dir
+DATA_FILES = [settings.data.crime_data, settings.data.current_crime_data]
+
+
+def _data_hash(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:10]
+
+
+def _region_dir(region):
+    # 'grid:40:-74' -> 'grid-40-m74', keeping the sign apart from 'grid:40:74'
+    return normalize(region.replace(':-', ':m')).replace(' ', '-')
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def render_region(args):
+    region, df, out_dir = args
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+
+    m = settings.map
+    surface = build_surface(df['Latitude'], df['Longitude'], df['Severity'], grid_size=m.kde_grid_size,
+                            bandwidth_m=m.kde_bandwidth_m, cell_m=m.kde_cell_m)
+    hotspot_map(df, surface).save(os.path.join(out_dir, 'hotspots.html'))
+    peaks = surface.peaks(10)
+    _write_json(os.path.join(out_dir, 'hotspots.geojson'), points_to_geojson(
+        [p['latitude'] for p in peaks], [p['longitude'] for p in peaks],
+        {'density': [round(p['density'], 3) for p in peaks]}))
+    _write_json(os.path.join(out_dir, 'incidents.geojson'), points_to_geojson(
+        df['Latitude'], df['Longitude'],
+        {'location': df['Location'], 'time': df['Time'], 'crime_type': df['CrimeType'], 'severity': df['Severity']}))
+    files.update(hotspots='hotspots.html', hotspot_peaks='hotspots.geojson', incidents='incidents.geojson')
+
+    zones, _ = find_safe_zones(df)
+    render_safe_map(zones, title=f'Safety Locations - {region}').save(os.path.join(out_dir, 'safe_zones.html'))
+    files['safe_zones'] = 'safe_zones.html'
+    return region, {'incidents': int(len(df)), 'safe_zones': int(len(zones)), 'files': files}
+
+
+def export_maps(data_files=DATA_FILES, out_root=EXPORT_DIR, workers=None, force=False):
+    data_hash = _data_hash(data_files)
+    latest_path = os.path.join(out_root, 'latest.json')
+    if not force and os.path.exists(latest_path):
+        with open(latest_path) as f:
+            latest = json.load(f)
+        if latest.get('data_hash') == data_hash:
+            return latest['version'], False
+
+    df = concat_incidents([clean_incidents(pd.read_csv(path))[0] for path in data_files])
+    df = df[DedupIndex(db_path=None).seed(df)].reset_index(drop=True)
+    regions = assign_regions(df['Latitude'], df['Longitude'])
+
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{data_hash}"
+    version_dir = os.path.join(out_root, version)
+    tasks = [(region, df.iloc[idx].reset_index(drop=True), os.path.join(version_dir, _region_dir(region)))
+             for region, idx in pd.Series(regions).groupby(regions, sort=True).indices.items()]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = dict(pool.map(render_region, tasks))
+
+    manifest = {
+        'version': version,
+        'data_hash': data_hash,
+        'data_files': list(data_files),
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'regions': {region: dict(results[region], path=os.path.basename(out_dir)) for region, _, out_dir in tasks},
+    }
+    _write_json(os.path.join(version_dir, 'manifest.json'), manifest)
+    tmp_path = latest_path + '.tmp'
+    _write_json(tmp_path, {'version': version, 'data_hash': data_hash})
+    os.replace(tmp_path, latest_path)
+    return version, True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render static hotspot and safe-zone maps for every region.')
+    parser.add_argument('--data', nargs='+', default=DATA_FILES, help='incident CSV files')
+    parser.add_argument('--out', default=EXPORT_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='export even if the data is unchanged')
+    args = parser.parse_args()
+    version, written = export_maps(args.data, args.out, args.workers, args.force)
+    print(f"{'Exported' if written else 'Up to date:'} {os.path.join(args.out, version)}")
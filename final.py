@@ -1,83 +1,11 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session
-import sqlite3
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.svm import SVC
-from sklearn.cluster import KMeans
-import folium
-import os
-
-app = Flask(__name__)
-app.secret_key = 'secret123'
-
-# === DB Setup ===
-if not os.path.exists('users.db'):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)''')
-    conn.commit()
-    conn.close()
-
-# === Load Data and Train Models ===
-crime_data = pd.read_csv('crime_data.csv')
-
-label_encoders = {}
-model_svm = None
-model_kmeans = None
-
-def preprocess(df):
-    df = df.dropna()
-    for col in ['Location', 'Time', 'CrimeType']:
-        df[col] = df[col].astype(str).str.lower().str.strip()
-        
-        if col not in label_encoders:
-            le = LabelEncoder()
-            df[col] = df[col].fillna('unknown')
-            le.fit(list(df[col].unique()) + ['unknown'])
-            df[col] = le.transform(df[col])
-            label_encoders[col] = le
-        else:
-            le = label_encoders[col]
-            # Replace unseen values with 'unknown'
-            df[col] = df[col].apply(lambda x: x if x in le.classes_ else 'unknown')
-            
-            if 'unknown' not in le.classes_:
-                le.classes_ = np.append(le.classes_, 'unknown')
-            df[col] = le.transform(df[col])    
-           # df[col] = label_encoders[col].transform(df[col])
-    return df
-
-def train_models():
-    global model_svm, model_kmeans
-    df = preprocess(crime_data.copy())
-    X = df[['Location', 'Time', 'CrimeType']]
-    y = df['Severity'] if 'Severity' in df else df.iloc[:, -1]
-    model_svm = SVC()
-    model_svm.fit(X, y)
-    model_kmeans = KMeans(n_clusters=5, n_init=10)
-    model_kmeans.fit(df[['Latitude', 'Longitude']])
-
-def predict_crime(location, time, crime_type):
-    df = pd.DataFrame([[location, time, crime_type]], columns=['Location', 'Time', 'CrimeType'])
-    df = preprocess(df)
-    prediction = model_svm.predict(df)[0]
-    return f"Predicted Crime Severity: {prediction}"
-
-def generate_heatmap():
-    df = crime_data.copy()
-    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=12)
-    for _, row in df.iterrows():
-        folium.CircleMarker(
-            location=[row['Latitude'], row['Longitude']],
-            radius=5,
-            popup=row['CrimeType'],
-            fill=True,
-            color='red',
-            fill_opacity=0.7
-        ).add_to(map_)
-    return map_._repr_html_()
-
-train_models()
+from flask import Blueprint, render_template_string, request, redirect, url_for, session
+from core import load_models, predict_crime, risk_page
+from auth import login_user, register_user
+
+# Landing-page UI, mounted under /final by app.py on the shared core models.
+# Its pages are plain Jinja templates (not f-strings) because the inline CSS
+# and scripts are full of braces.
+bp = Blueprint('final', __name__)
 
 base_css = """
 <style>
@@ -132,9 +60,9 @@ h3 {
 </style>
 """
 
-@app.route('/')
+@bp.route('/')
 def index():
-    return render_template_string(f'''
+    return render_template_string('''
 
 <html lang="en">
 <head>
@@ -349,20 +277,15 @@ def index():
 </html>
     ''')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
-        u, p = request.form['username'], request.form['password']
-        try:
-            conn = sqlite3.connect('users.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (u, p))
-            conn.commit()
-            conn.close()
-            return redirect(url_for('login'))
-        except:
-            return "Username already exists."
-    return render_template_string(f'''
+        # This UI signs people up by email address, stored as the username
+        error = register_user(request.form['email'], request.form['password'])
+        if error:
+            return error
+        return redirect(url_for('.login'))
+    return render_template_string('''
     <html lang="en">
 <head>
   <meta charset="UTF-8">
@@ -475,7 +398,7 @@ def register():
 
   <div class="container">
     <h2>User Registration</h2>
-    <form action="/register" method="POST">
+    <form action="{{ url_for('.register') }}" method="POST">
       <label for="phone">Phone Number</label>
       <input type="tel" id="phone" name="phone" required placeholder="Enter your phone number">
 
@@ -495,7 +418,7 @@ def register():
     </form>
 
     <div class="footer">
-      Already registered? <a href="/login" style="color: #ff80ab;">Login here</a>
+      Already registered? <a href="{{ url_for('.login') }}" style="color: #ff80ab;">Login here</a>
     </div>
   </div>
 
@@ -503,21 +426,14 @@ def register():
 </html>
     ''')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        u, p = request.form['username'], request.form['password']
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE username=? AND password=?", (u, p))
-        user = c.fetchone()
-        conn.close()
-        if user:
-            session['username'] = u
-            return redirect(url_for('dashboard'))
-        else:
-            return "Invalid credentials."
-    return render_template_string(f'''
+        error = login_user(request.form['email'], request.form['password'])
+        if error:
+            return error
+        return redirect(url_for('.dashboard'))
+    return render_template_string('''
     <html lang="en">
 <head>
   <meta charset="UTF-8">
@@ -640,7 +556,7 @@ def login():
 
   <div class="login-container">
     <h2>Login to Safety Locator</h2>
-    <form action="/login" method="POST">
+    <form action="{{ url_for('.login') }}" method="POST">
       <label for="email">Email Address</label>
       <input type="email" id="email" name="email" required placeholder="Enter your email">
 
@@ -651,7 +567,7 @@ def login():
     </form>
 
     <div class="footer">
-      Don't have an account? <a href="/register">Register here</a>
+      Don't have an account? <a href="{{ url_for('.register') }}">Register here</a>
     </div>
   </div>
 
@@ -659,19 +575,21 @@ def login():
 </html>
     ''')
 
-@app.route('/dashboard', methods=['GET', 'POST'])
+@bp.route('/dashboard', methods=['GET', 'POST'])
 def dashboard():
     if 'username' not in session:
-        return redirect(url_for('login'))
-    
+        return redirect(url_for('.login'))
+    load_models()
+
     prediction = None
     if request.method == 'POST':
         location = request.form['location']
         time = request.form['time']
         crime_type = request.form['crime_type']
         prediction = predict_crime(location, time, crime_type)
+    risk = risk_page(request.args.get('page', 1, type=int))
 
-    return render_template_string(f'''
+    return render_template_string('''
     <html lang="en">
 <head>
   <meta charset="UTF-8">
@@ -819,7 +737,7 @@ def dashboard():
 <header>Safety Locator - Crime Prediction Dashboard</header>
 
 <div class="dashboard">
-  <form action="/submit_crime" method="POST">
+  <form action="{{ url_for('.dashboard') }}" method="POST">
     <div class="form-group">
       <label for="location">Location (Tamil Nadu)</label>
       <input type="text" id="location" name="location" placeholder="e.g., Chennai, Madurai" required>
@@ -848,41 +766,43 @@ def dashboard():
       <button type="button" onclick="alert('Logging out')">Logout</button>
     </div>
   </form>
+  {% if prediction %}<h2 style="margin-top: 30px;">{{ prediction }}</h2>{% endif %}
 
-  <h2 style="margin-top: 30px;">Crime Records in Tamil Nadu (1990–2024)</h2>
+  <h2 style="margin-top: 30px;">Location Risk Ranking</h2>
   <table>
     <thead>
       <tr>
-        <th>Year</th>
         <th>Location</th>
-        <th>Crime Type</th>
-        <th>Reported Cases</th>
+        <th>Incidents</th>
+        <th>Risk Score</th>
+        <th>Avg Severity</th>
+        <th>Peak Hour</th>
       </tr>
     </thead>
     <tbody>
-      <tr><td>1990</td><td>Chennai</td><td>Theft</td><td>1200</td></tr>
-      <tr><td>1995</td><td>Madurai</td><td>Robbery</td><td>480</td></tr>
-      <tr><td>2000</td><td>Coimbatore</td><td>Assault</td><td>700</td></tr>
-      <tr><td>2005</td><td>Trichy</td><td>Murder</td><td>90</td></tr>
-      <tr><td>2010</td><td>Salem</td><td>Kidnapping</td><td>110</td></tr>
-      <tr><td>2015</td><td>Chennai</td><td>Sexual Harassment</td><td>350</td></tr>
-      <tr><td>2020</td><td>Madurai</td><td>Theft</td><td>950</td></tr>
-      <tr><td>2023</td><td>Coimbatore</td><td>Robbery</td><td>420</td></tr>
-      <tr><td>2024</td><td>Chennai</td><td>Assault</td><td>780</td></tr>
+      {% for r in risk.rows %}
+      <tr><td>{{ r.location }}</td><td>{{ r.incidents }}</td><td>{{ r.score }}</td><td>{{ r.mean_severity }}</td>
+          <td>{{ r.peak_hour or '-' }}</td></tr>
+      {% endfor %}
     </tbody>
   </table>
+  <p>
+    {% if risk.page > 1 %}<a href="{{ url_for('.dashboard', page=risk.page - 1) }}">← Prev</a>{% endif %}
+    Page {{ risk.page }} of {{ risk.pages }}
+    {% if risk.page < risk.pages %}<a href="{{ url_for('.dashboard', page=risk.page + 1) }}">Next →</a>{% endif %}
+  </p>
 </div>
 
 </body>
 </html>
-    ''', prediction=prediction)
+    ''', prediction=prediction, risk=risk)
 
-@app.route('/heatmap')
+@bp.route('/heatmap')
 def heatmap():
     if 'username' not in session:
-        return redirect(url_for('login'))
-    map_html = generate_heatmap()
-    return render_template_string(f'''
+        return redirect(url_for('.login'))
+    # The page draws its own Leaflet heat layer, so no folium map is built
+    return render_template_string('''
     <html lang="en">
 <head>
   <meta charset="UTF-8">
@@ -982,16 +902,29 @@ def heatmap():
       0.9: 'red'
     }
   }).addTo(map);
+
+  // Incidents reported from now on are added as they come in
+  if (window.EventSource) {
+    var live = new EventSource({{ url_for('api.live')|tojson }}, {withCredentials: true});
+    live.addEventListener('incidents', function(e) {
+      JSON.parse(e.data).incidents.forEach(function(p) {
+        heat.addLatLng([p.latitude, p.longitude, Math.min(1, p.severity / 5)]);
+      });
+    });
+  }
 </script>
 
 </body>
 </html>
-    ''', map_html=map_html)
+    ''')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
-    session.pop('username', None)
-    return redirect(url_for('index'))
+    # Drops the server-side session row as well
+    session.clear()
+    return redirect(url_for('.index'))
 
 if __name__ == '__main__':
+    # Serves every UI; this one is at /final
+    from app import app
     app.run(debug=True)
\ No newline at end of file
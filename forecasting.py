@@ -0,0 +1,131 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+# === Per-location crime forecasts ===
+# Incident counts per (Location, CrimeType) are laid out as one short series
+# over the ordered data periods (past, current, ...). Each series gets a damped
+# Holt linear trend fitted offline, locations split across a process pool, and
+# the forecasts are kept in one float32 table with a dict index so a request
+# is a lookup, never a fit.
+PERIOD_FILES = [('past', settings.data.past_crime_data), ('current', settings.data.current_crime_data)]
+FORECAST_FILE = settings.data.forecasts
+HORIZON = 3
+# Below this many series a single vectorized fit beats pool start-up cost
+PARALLEL_MIN_SERIES = 200_000
+
+
+def holt_forecast(y, horizon=HORIZON, alpha=0.6, beta=0.4, phi=0.9):
+    # Damped Holt linear trend over the last axis, so a 2-D (series x periods)
+    # block is fitted in one pass. With two points it reduces to a damped
+    # extrapolation of the last change. Counts can't go negative.
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    level = y[:, 0]
+    trend = y[:, 1] - y[:, 0] if y.shape[1] > 1 else np.zeros(len(y))
+    for t in range(1, y.shape[1]):
+        prev_level = level
+        level = alpha * y[:, t] + (1 - alpha) * (prev_level + phi * trend)
+        trend = beta * (level - prev_level) + (1 - beta) * phi * trend
+    damping = np.cumsum(phi ** np.arange(1, horizon + 1))
+    return np.maximum(level[:, None] + trend[:, None] * damping, 0.0)
+
+
+def period_counts(periods):
+    # periods: ordered [(label, DataFrame)] -> counts indexed by
+    # (location, crime_type) with one column per period label
+    frames = []
+    for label, df in periods:
+        keys = pd.DataFrame({
+            'location': df['Location'].astype(str).str.strip().str.lower(),
+            'crime_type': df['CrimeType'].astype(str).str.strip().str.lower(),
+        })
+        frames.append(keys.groupby(['location', 'crime_type']).size().rename(label))
+    labels = [label for label, _ in periods]
+    return pd.concat(frames, axis=1).reindex(columns=labels).fillna(0).astype(np.int64)
+
+
+def _fit_chunk(args):
+    history, horizon = args
+    return holt_forecast(history, horizon)
+
+
+def build_forecasts(periods, horizon=HORIZON, workers=None):
+    counts = period_counts(periods)
+    history = counts.to_numpy(dtype=float)
+    locations = counts.index.get_level_values('location')
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8) if len(counts) >= PARALLEL_MIN_SERIES else 1
+    # Chunks hold whole locations, one chunk per worker
+    codes, _ = pd.factorize(locations)
+    chunk_of = codes % workers
+    chunks = [np.flatnonzero(chunk_of == i) for i in range(workers)]
+    chunks = [c for c in chunks if len(c)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [_fit_chunk((history[c], horizon)) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            results = list(pool.map(_fit_chunk, [(history[c], horizon) for c in chunks]))
+    forecast = np.empty((len(counts), horizon), dtype=np.float32)
+    for c, result in zip(chunks, results):
+        forecast[c] = result
+    table = counts.copy()
+    for step in range(horizon):
+        table[f'step_{step + 1}'] = forecast[:, step]
+    return ForecastTable(table.reset_index())
+
+
+class ForecastTable:
+
+    def __init__(self, table):
+        self.table = table
+        self.history_columns = [c for c in table.columns if c not in ('location', 'crime_type') and not c.startswith('step_')]
+        self.step_columns = [c for c in table.columns if c.startswith('step_')]
+        self._history = table[self.history_columns].to_numpy(dtype=np.int64)
+        self._steps = table[self.step_columns].to_numpy(dtype=np.float32)
+        self._index = {}
+        self._by_location = {}
+        for i, (location, crime_type) in enumerate(zip(table['location'], table['crime_type'])):
+            self._index[(location, crime_type)] = i
+            self._by_location.setdefault(location, []).append(i)
+
+    def _row(self, i):
+        return {
+            'location': self.table['location'].iat[i],
+            'crime_type': self.table['crime_type'].iat[i],
+            'history': dict(zip(self.history_columns, self._history[i].tolist())),
+            'forecast': [round(float(v), 2) for v in self._steps[i]],
+        }
+
+    def lookup(self, location, crime_type=None):
+        location = str(location).strip().lower()
+        if crime_type is None:
+            return [self._row(i) for i in self._by_location.get(location, [])]
+        i = self._index.get((location, str(crime_type).strip().lower()))
+        return [] if i is None else [self._row(i)]
+
+    def save(self, path=FORECAST_FILE):
+        self.table.to_csv(path, index=False, float_format='%.3f')
+
+    @classmethod
+    def load(cls, path=FORECAST_FILE):
+        table = pd.read_csv(path)
+        steps = [c for c in table.columns if c.startswith('step_')]
+        table[steps] = table[steps].astype(np.float32)
+        return cls(table)
+
+
+def load_periods(files=PERIOD_FILES):
+    return [(label, pd.read_csv(path)) for label, path in files]
+
+
+if __name__ == '__main__':
+    # python forecasting.py [horizon]  -> writes forecasts.csv
+    horizon = int(sys.argv[1]) if len(sys.argv) > 1 else HORIZON
+    forecasts = build_forecasts(load_periods(), horizon)
+    forecasts.save()
+    print(f'Wrote {len(forecasts.table)} forecasts to {FORECAST_FILE}')
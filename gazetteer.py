@@ -0,0 +1,67 @@
+import csv
+import difflib
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+# === Offline gazetteer ===
+# Resolves free-text locations ("Chennai ", "chennai central", "Madras") to a
+# canonical place and its coordinates using the bundled gazetteer.csv: exact
+# match on a normalized name or alias, then the longest known phrase inside
+# the input, then a close fuzzy match. Results sit behind an LRU cache.
+GAZETTEER_FILE = 'gazetteer.csv'
+CACHE_SIZE = 4096
+FUZZY_CUTOFF = 0.8
+
+Place = namedtuple('Place', ['name', 'latitude', 'longitude', 'region'])
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+class Gazetteer:
+
+    def __init__(self, places, cache_size=CACHE_SIZE):
+        # places: iterable of (Place, [aliases])
+        self.places = []
+        self._index = {}
+        for place, aliases in places:
+            self.places.append(place)
+            for key in [place.name, *aliases]:
+                key = normalize(key)
+                if key:
+                    self._index.setdefault(key, place)
+        self._keys = list(self._index)
+        self._max_words = max((len(k.split()) for k in self._keys), default=1)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def load(cls, path=GAZETTEER_FILE, **kwargs):
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        return cls(((Place(r['name'], float(r['latitude']), float(r['longitude']), r.get('region') or r['name']),
+                     [a for a in (r.get('aliases') or '').split('|') if a])
+                    for r in rows), **kwargs)
+
+    def _resolve(self, text):
+        key = normalize(text)
+        if not key:
+            return None
+        place = self._index.get(key)
+        if place is not None:
+            return place
+        # "near chennai central station" -> longest known phrase in the input
+        words = key.split()
+        for size in range(min(self._max_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                place = self._index.get(' '.join(words[start:start + size]))
+                if place is not None:
+                    return place
+        match = difflib.get_close_matches(key, self._keys, n=1, cutoff=FUZZY_CUTOFF)
+        return self._index[match[0]] if match else None
+
+    def cache_info(self):
+        return self.resolve.cache_info()
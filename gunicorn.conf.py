@@ -0,0 +1,36 @@
+# gunicorn -c gunicorn.conf.py
+# The master imports app.py and calls create_app() once, then forks the
+# workers, so every worker shares the dataset and fitted models copy-on-write
+# instead of reading crime_data.csv and training on its own.
+import os
+
+from memstats import log_memory
+
+# Models are loaded by create_app(); don't also train at import time
+os.environ.setdefault('STARTUP_MODE', 'lazy')
+# Bound to localhost, so clients come through one reverse proxy (PROXY_COUNT)
+os.environ.setdefault('PROXY_COUNT', '1')
+
+wsgi_app = 'app:create_app()'
+preload_app = True
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+# /api/live streams stay open, so a sync worker would be tied up by one map.
+# gthread gives each stream a thread for its whole life; WORKER_CLASS=gevent
+# (if installed) makes them greenlets, which is the setting for hundreds of
+# open maps.
+worker_class = os.environ.get('WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('WORKER_THREADS', '32'))
+
+
+def when_ready(server):
+    log_memory('master ready')
+
+
+def post_worker_init(worker):
+    log_memory('worker booted')
+    if worker.cfg.worker_class_str == 'gthread':
+        # Live streams get at most a quarter of the threads, so open maps
+        # can't starve page and API requests
+        import api
+        api.LIVE_MAX_CLIENTS = min(api.LIVE_MAX_CLIENTS, max(1, worker.cfg.threads // 4))
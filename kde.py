@@ -0,0 +1,132 @@
+import numpy as np
+
+# === Kernel density hotspot surface ===
+# Incidents are binned (weighted by Severity) onto a fixed grid of square
+# cells and smoothed with a Gaussian kernel by FFT convolution. After the
+# O(n) binning pass everything costs the same however many incidents there
+# are, so the surface can back the heatmap, peak search and route scoring.
+GRID_SIZE = 256
+BANDWIDTH_M = 300.0
+METERS_PER_DEG_LAT = 111_320.0
+
+
+class DensitySurface:
+
+    def __init__(self, density, south, west, cell_lat, cell_lon, cell_m, counts=None):
+        self.density = density          # weighted incidents per km^2, rows = lat
+        self.counts = counts            # raw incidents per cell before smoothing
+        self.south = south
+        self.west = west
+        self.cell_lat = cell_lat        # cell size in degrees
+        self.cell_lon = cell_lon
+        self.cell_m = cell_m            # cell size in meters
+
+    @property
+    def shape(self):
+        return self.density.shape
+
+    def cell_index(self, lat, lon):
+        # Grid (row, col) for coordinates, or -1 where they fall off the grid
+        rows = np.floor((np.asarray(lat, dtype=float) - self.south) / self.cell_lat).astype(np.int64)
+        cols = np.floor((np.asarray(lon, dtype=float) - self.west) / self.cell_lon).astype(np.int64)
+        outside = (rows < 0) | (rows >= self.shape[0]) | (cols < 0) | (cols >= self.shape[1])
+        return np.where(outside, -1, rows), np.where(outside, -1, cols)
+
+    def value_at(self, lat, lon):
+        rows, cols = self.cell_index(lat, lon)
+        inside = rows >= 0
+        values = np.zeros(np.shape(rows), dtype=float)
+        values[inside] = self.density[rows[inside], cols[inside]]
+        return values
+
+    def cell_center(self, rows, cols):
+        return (self.south + (np.asarray(rows) + 0.5) * self.cell_lat,
+                self.west + (np.asarray(cols) + 0.5) * self.cell_lon)
+
+    def peaks(self, n=10, min_density=0.0):
+        # Local maxima over each cell's 3x3 neighbourhood, strongest first. On
+        # a plateau only the first cell in raster order counts as the peak.
+        d = self.density
+        padded = np.pad(d, 1, mode='constant', constant_values=-np.inf)
+        is_peak = d > min_density
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr or dc:
+                    neighbour = padded[1 + dr:1 + dr + d.shape[0], 1 + dc:1 + dc + d.shape[1]]
+                    is_peak &= (d > neighbour) if (dr, dc) < (0, 0) else (d >= neighbour)
+        flat = np.flatnonzero(is_peak)
+        if len(flat) > n:
+            flat = flat[np.argpartition(d.ravel()[flat], -n)[-n:]]
+        flat = flat[np.argsort(d.ravel()[flat])[::-1]]
+        rows, cols = np.unravel_index(flat, d.shape)
+        lats, lons = self.cell_center(rows, cols)
+        return [{'latitude': float(la), 'longitude': float(lo), 'density': float(d[r, c])}
+                for la, lo, r, c in zip(lats, lons, rows, cols)]
+
+    def heat_points(self, min_fraction=0.05):
+        # [lat, lon, weight 0..1] for cells above min_fraction of the maximum,
+        # ready for folium.plugins.HeatMap
+        peak = self.density.max()
+        if peak <= 0:
+            return []
+        rows, cols = np.nonzero(self.density >= peak * min_fraction)
+        lats, lons = self.cell_center(rows, cols)
+        weights = self.density[rows, cols] / peak
+        return np.column_stack([lats, lons, weights]).round(6).tolist()
+
+
+def gaussian_kernel(sigma_cells):
+    radius = max(1, int(np.ceil(3 * sigma_cells)))
+    offsets = np.arange(-radius, radius + 1)
+    g = np.exp(-0.5 * (offsets / sigma_cells) ** 2)
+    kernel = np.outer(g, g)
+    return kernel / kernel.sum()
+
+
+def fft_convolve(grid, kernel):
+    # Linear (not circular) convolution, cropped back to the grid shape
+    rows = grid.shape[0] + kernel.shape[0] - 1
+    cols = grid.shape[1] + kernel.shape[1] - 1
+    out = np.fft.irfft2(np.fft.rfft2(grid, (rows, cols)) * np.fft.rfft2(kernel, (rows, cols)), (rows, cols))
+    r0, c0 = kernel.shape[0] // 2, kernel.shape[1] // 2
+    out = out[r0:r0 + grid.shape[0], c0:c0 + grid.shape[1]]
+    return np.maximum(out, 0.0)
+
+
+def build_surface(lat, lon, weights=None, grid_size=GRID_SIZE, bandwidth_m=BANDWIDTH_M, cell_m=None, pad_m=None):
+    # cell_m fixes the cell size instead of fitting grid_size cells on the
+    # longer side; grid_size then only caps the number of cells per side.
+    # pad_m is the margin around the incidents (default 3 bandwidths).
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    ok = np.isfinite(lat) & np.isfinite(lon)
+    lat, lon = lat[ok], lon[ok]
+    weights = np.ones(len(lat)) if weights is None else np.asarray(weights, dtype=float)[ok]
+    if not len(lat):
+        raise ValueError('No incidents with coordinates')
+
+    # Square cells in meters, padded by 3 bandwidths so kernels aren't clipped
+    meters_per_deg_lon = METERS_PER_DEG_LAT * max(np.cos(np.radians(lat.mean())), 0.01)
+    pad_m = max(pad_m or 0, 3 * bandwidth_m)
+    south = lat.min() - pad_m / METERS_PER_DEG_LAT
+    north = lat.max() + pad_m / METERS_PER_DEG_LAT
+    west = lon.min() - pad_m / meters_per_deg_lon
+    east = lon.max() + pad_m / meters_per_deg_lon
+    height_m = (north - south) * METERS_PER_DEG_LAT
+    width_m = (east - west) * meters_per_deg_lon
+    cell_m = max(cell_m or 0, max(height_m, width_m) / grid_size)
+    n_rows = max(1, int(np.ceil(height_m / cell_m)))
+    n_cols = max(1, int(np.ceil(width_m / cell_m)))
+    cell_lat = cell_m / METERS_PER_DEG_LAT
+    cell_lon = cell_m / meters_per_deg_lon
+
+    rows = np.clip(((lat - south) / cell_lat).astype(np.int64), 0, n_rows - 1)
+    cols = np.clip(((lon - west) / cell_lon).astype(np.int64), 0, n_cols - 1)
+    flat = rows * n_cols + cols
+    grid = np.bincount(flat, weights=weights, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+    counts = np.bincount(flat, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+    # Bandwidth never narrower than a cell, or the "surface" is just the bins
+    density = fft_convolve(grid, gaussian_kernel(max(bandwidth_m / cell_m, 1.0)))
+    density /= (cell_m / 1000.0) ** 2
+    return DensitySurface(density, south, west, cell_lat, cell_lon, cell_m, counts)
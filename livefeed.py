@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# === Live incident feed ===
+# Incidents appended to crime_data.csv are pushed to open maps as
+# Server-Sent Events, so the heatmap updates in place instead of being
+# re-rendered. Each append is formatted once into a small ring buffer and
+# every client reads from that shared ring under one Condition. A client
+# keeps only the last file offset it has seen; there is no per-client queue
+# and no per-client thread inside the broadcaster.
+#
+# Event ids are byte offsets in the file, which every worker process agrees
+# on. A page rendered by one worker can resume its stream on another. A
+# browser that reconnects sends Last-Event-ID and gets what it missed from
+# the ring. When its offset is no longer in the ring, or the file was
+# rewritten, it gets a 'reload' event instead.
+
+
+def append_payload(rows, cell_size=None, max_points=500):
+    # New incidents (up to max_points) plus per-grid-cell count and severity
+    # deltas covering all of them (cells of analytics.CELL_SIZE_DEG by default)
+    import numpy as np
+    import pandas as pd
+    if cell_size is None:
+        from analytics import CELL_SIZE_DEG as cell_size
+    lat = rows['Latitude'].to_numpy(dtype=float)
+    lon = rows['Longitude'].to_numpy(dtype=float)
+    cells = pd.DataFrame({
+        'row': np.floor(lat / cell_size).astype(np.int64),
+        'col': np.floor(lon / cell_size).astype(np.int64),
+        'severity': rows['Severity'].to_numpy(),
+    }).groupby(['row', 'col'])['severity'].agg(['size', 'sum'])
+    head = rows.iloc[:max_points]
+    return {
+        'count': len(rows),
+        'incidents': [
+            {'location': str(loc), 'time': str(t), 'crime_type': str(ct), 'severity': int(s),
+             'latitude': float(la), 'longitude': float(lo)}
+            for loc, t, ct, s, la, lo in zip(head['Location'], head['Time'], head['CrimeType'],
+                                             head['Severity'], head['Latitude'], head['Longitude'])
+        ],
+        'cells': [
+            {'cell': f'{r}:{c}', 'south': round(r * cell_size, 6), 'west': round(c * cell_size, 6),
+             'size': cell_size, 'incidents': int(n), 'severity': int(s)}
+            for (r, c), n, s in zip(cells.index, cells['size'], cells['sum'])
+        ],
+    }
+
+
+class Broadcaster:
+
+    def __init__(self, size=256, poll=None, poll_interval=1.0):
+        # poll: called every poll_interval seconds while the process has
+        # clients, to pick up appends made by other workers
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.position = None        # file offset the newest event ends at
+        self.generation = 0         # bumped when the file is reloaded
+        self.published = 0
+        self.clients = 0
+        self._events = deque(maxlen=size)   # (start offset, SSE text)
+        self._cond = threading.Condition()
+        self._poller_pid = None
+
+    def reset(self, position):
+        # The file was (re)loaded from scratch; clients must reload the page
+        with self._cond:
+            self._events.clear()
+            self.position = position
+            self.generation += 1
+            self._cond.notify_all()
+
+    def publish(self, position, event, data):
+        text = f'id: {position}\nevent: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+        with self._cond:
+            self._events.append((self.position, text))
+            self.position = position
+            self.published += 1
+            self._cond.notify_all()
+
+    def _since(self, after):
+        # Events after offset `after`; [] if there are none yet (or this
+        # process hasn't caught up with the client), None if the ring can't
+        # serve it. Caller holds self._cond.
+        if after >= self.position:
+            return []
+        texts = [text for start, text in self._events if start >= after]
+        if not texts or self._events[-len(texts)][0] != after:
+            return None
+        return texts
+
+    def _ensure_poller(self):
+        # One thread per process (a thread started before fork() is gone in
+        # the workers), running only while there are clients
+        if self.poll is None or self._poller_pid == os.getpid():
+            return
+        self._poller_pid = os.getpid()
+        threading.Thread(target=self._run_poller, name='live-feed-poll', daemon=True).start()
+
+    def _run_poller(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._cond:
+                if not self.clients:
+                    self._poller_pid = None
+                    return
+            try:
+                self.poll()
+            except Exception:
+                pass
+
+    def stream(self, after=None, heartbeat=15.0, max_age=300.0):
+        # SSE text for one client, starting after file offset `after` (None:
+        # from now). The stream ends after max_age seconds; the browser
+        # reconnects and resumes from its Last-Event-ID.
+        deadline = time.monotonic() + max_age
+        with self._cond:
+            self.clients += 1
+            self._ensure_poller()
+            generation = self.generation
+            if after is None:
+                after = self.position
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                with self._cond:
+                    if generation == self.generation and after >= self.position:
+                        self._cond.wait(max(0.0, min(heartbeat, deadline - time.monotonic())))
+                    pending = self._since(after) if generation == self.generation else None
+                    if pending:
+                        after = self.position
+                if pending is None:
+                    yield 'event: reload\ndata: {}\n\n'
+                    return
+                yield ''.join(pending) or ': keep-alive\n\n'
+                if time.monotonic() >= deadline:
+                    return
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+    def stats(self):
+        return {'clients': self.clients, 'published': self.published, 'buffered': len(self._events),
+                'position': self.position}
@@ -0,0 +1,180 @@
+import folium
+import numpy as np
+from branca.element import MacroElement
+from folium.plugins import HeatMap
+from jinja2 import Template
+
+# === Bulk map layers ===
+# Builds GeoJSON FeatureCollections straight from coordinate arrays so a map
+# gets one layer (one JS block) for the whole data set instead of a folium
+# object per row.
+
+
+def _properties(properties, n):
+    columns = {k: np.asarray(v).tolist() for k, v in (properties or {}).items()}
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())] if keys else [{}] * n
+
+
+def cells_to_geojson(lat, lon, half_lat, half_lon, properties=None):
+    # Axis-aligned rectangles centred on (lat, lon), one Feature each
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    south, north = (lat - half_lat).round(6), (lat + half_lat).round(6)
+    west, east = (lon - half_lon).round(6), (lon + half_lon).round(6)
+    rings = np.stack([
+        np.column_stack([west, south]), np.column_stack([east, south]), np.column_stack([east, north]),
+        np.column_stack([west, north]), np.column_stack([west, south]),
+    ], axis=1).tolist()
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': [ring]}, 'properties': props}
+            for ring, props in zip(rings, _properties(properties, len(lat)))
+        ],
+    }
+
+
+def points_to_geojson(lat, lon, properties=None):
+    coords = np.column_stack([np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)]).round(6).tolist()
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': xy}, 'properties': props}
+            for xy, props in zip(coords, _properties(properties, len(coords)))
+        ],
+    }
+
+
+def add_points_layer(map_, df, popup_field=None, name='Incidents', radius=5, color='red', fill_opacity=0.7):
+    # Every row of df as a CircleMarker, but inside a single GeoJson layer
+    df = df.dropna(subset=['Latitude', 'Longitude'])
+    properties = {popup_field: df[popup_field].astype(str)} if popup_field else None
+    folium.GeoJson(
+        points_to_geojson(df['Latitude'], df['Longitude'], properties),
+        name=name,
+        marker=folium.CircleMarker(radius=radius, fill=True, color=color, fill_opacity=fill_opacity),
+        popup=folium.GeoJsonPopup(fields=[popup_field], labels=False) if popup_field else None,
+    ).add_to(map_)
+    return map_
+
+
+def hotspot_map(df, surface, points=True, peaks=5, zoom_start=12, marker_radius=5, live_url=None):
+    # KDE heat layer, the strongest peaks and (optionally) every incident;
+    # with live_url, incidents ingested later are added as they arrive
+    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=zoom_start)
+    heat = HeatMap(surface.heat_points(), radius=15, blur=10, min_opacity=0.3).add_to(map_)
+    for peak in surface.peaks(peaks):
+        folium.Marker(
+            location=[peak['latitude'], peak['longitude']],
+            popup=f"Hotspot density {peak['density']:.1f}/km²",
+            icon=folium.Icon(color='darkred', icon='warning-sign')
+        ).add_to(map_)
+    if points:
+        add_points_layer(map_, df, popup_field='CrimeType', radius=marker_radius)
+    if live_url:
+        map_.add_child(LiveFeedLayer(live_url, heat, marker_radius=marker_radius))
+    return map_
+
+
+class ClusterLayer(MacroElement):
+    # Client half of clustering.ZoomClusters: on every pan/zoom the map asks
+    # `url` for the clusters (or, zoomed in, the incidents) in view and
+    # redraws just those. Clicking a cluster zooms in on it.
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>
+            .incident-cluster { background: rgba(220, 53, 69, 0.75); border: 2px solid #fff; border-radius: 50%;
+                                color: #fff; font: bold 12px sans-serif; display: flex; align-items: center;
+                                justify-content: center; }
+        </style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var layer = L.layerGroup().addTo(map);
+            var pending = null;
+            function draw(data) {
+                layer.clearLayers();
+                L.geoJSON(data, {pointToLayer: function(feature, latlng) {
+                    var p = feature.properties;
+                    if (p.count > 1) {
+                        var size = Math.round(26 + Math.min(34, 4 * Math.log2(p.count)));
+                        return L.marker(latlng, {icon: L.divIcon({html: String(p.count), className: 'incident-cluster',
+                                                                   iconSize: [size, size]})})
+                            .bindTooltip(p.count + ' incidents, mean severity ' + p.mean_severity)
+                            .on('click', function() { map.setView(latlng, Math.min(map.getZoom() + 2, map.getMaxZoom())); });
+                    }
+                    return L.circleMarker(latlng, {radius: 5, color: 'red', fill: true, fillOpacity: 0.7})
+                        .bindPopup(p.crime_type || ('Severity ' + (p.severity || p.max_severity)));
+                }}).addTo(layer);
+            }
+            function refresh() {
+                var b = map.getBounds();
+                var url = {{ this.url|tojson }} + '?zoom=' + map.getZoom() + '&bbox=' +
+                    [b.getSouth(), b.getWest(), b.getNorth(), b.getEast()].map(function(v) { return v.toFixed(6); }).join(',');
+                if (pending) { pending.abort(); }
+                pending = new AbortController();
+                fetch(url, {credentials: 'same-origin', signal: pending.signal})
+                    .then(function(r) { return r.json(); })
+                    .then(draw)
+                    .catch(function() {});
+            }
+            map.on('moveend', refresh);
+            refresh();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, url):
+        super().__init__()
+        self._name = 'ClusterLayer'
+        self.url = url
+
+
+class LiveFeedLayer(MacroElement):
+    # Client half of livefeed.Broadcaster: listens on `url` (Server-Sent
+    # Events) and adds each new incident to the heat layer and as a marker.
+    # Grid cells that received incidents are outlined with their running
+    # count. A 'reload' event means the data was replaced; the page reloads.
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            if (!window.EventSource) { return; }
+            var map = {{ this._parent.get_name() }};
+            var heat = {{ this.heat.get_name() }};
+            var markers = L.layerGroup().addTo(map);
+            var cells = {};
+            var source = new EventSource({{ this.url|tojson }}, {withCredentials: true});
+            source.addEventListener('incidents', function(e) {
+                var data = JSON.parse(e.data);
+                data.incidents.forEach(function(p) {
+                    heat.addLatLng([p.latitude, p.longitude]);
+                    L.circleMarker([p.latitude, p.longitude], {radius: {{ this.marker_radius }}, color: 'orange',
+                                                               fill: true, fillOpacity: 0.8})
+                        .bindPopup(p.crime_type + ' (' + p.time + '), severity ' + p.severity).addTo(markers);
+                });
+                data.cells.forEach(function(c) {
+                    var cell = cells[c.cell];
+                    if (!cell) {
+                        cell = cells[c.cell] = {incidents: 0, severity: 0, shape: L.rectangle(
+                            [[c.south, c.west], [c.south + c.size, c.west + c.size]],
+                            {color: 'orange', weight: 1, fillOpacity: 0.1}).addTo(markers)};
+                    }
+                    cell.incidents += c.incidents;
+                    cell.severity += c.severity;
+                    cell.shape.bindTooltip(cell.incidents + ' new incident(s), mean severity ' +
+                                           (cell.severity / cell.incidents).toFixed(1));
+                });
+            });
+            source.addEventListener('reload', function() { source.close(); window.location.reload(); });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, heat, marker_radius=5):
+        super().__init__()
+        self._name = 'LiveFeedLayer'
+        self.url = url
+        self.heat = heat
+        self.marker_radius = marker_radius
@@ -0,0 +1,30 @@
+import os
+import resource
+
+
+def memory_usage(pid='self'):
+    # Resident memory of a process in kB. On Linux smaps_rollup also splits it
+    # into Pss (shared pages divided between the processes mapping them) and
+    # private pages, which is what tells copy-on-write sharing apart from real
+    # per-worker cost. Elsewhere only the peak RSS of this process is known.
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                    usage[key.lower()] = int(rest.split()[0])
+    except OSError:
+        if pid == 'self':
+            usage['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage
+    usage['private'] = usage.get('private_clean', 0) + usage.get('private_dirty', 0)
+    usage['shared'] = usage.get('shared_clean', 0) + usage.get('shared_dirty', 0)
+    return usage
+
+
+def log_memory(label, pid='self'):
+    usage = memory_usage(pid)
+    print(f"[memory] {label} pid={os.getpid() if pid == 'self' else pid} "
+          + ' '.join(f'{k}={v}kB' for k, v in sorted(usage.items())), flush=True)
+    return usage
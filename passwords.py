@@ -0,0 +1,102 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+
+from config import settings
+
+# === Password hashing ===
+# Stored as "scrypt$<n>$<r>$<p>$<salt>$<hash>" (base64 salt/hash). Rows that
+# still hold a plaintext password, or a hash made with older parameters, are
+# verified once and rewritten on the next successful login.
+# PASSWORD_SCRYPT_N sets the work factor; `python passwords.py --target-ms 50`
+# measures which n gives the wanted login latency on this machine.
+SCRYPT_N = settings.auth.scrypt_n
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p):
+    # Leave headroom over the 128*n*r bytes scrypt needs; OpenSSL's default
+    # cap is 32 MiB, which n >= 2**15 would exceed
+    maxmem = 128 * n * r * (p + 1) + (1 << 20)
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=HASH_BYTES)
+
+
+def hash_password(password, n=None):
+    n = n or SCRYPT_N
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f'scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(_scrypt(password, salt, n, SCRYPT_R, SCRYPT_P))}'
+
+
+def verify_password(stored, password):
+    # -> (matches, needs_rehash)
+    if stored is None:
+        return False, False
+    if stored.startswith('scrypt$'):
+        try:
+            _, n, r, p, salt, expected = stored.split('$')
+            n, r, p = int(n), int(r), int(p)
+            actual = _scrypt(password, base64.b64decode(salt), n, r, p)
+            expected = base64.b64decode(expected)
+        except (ValueError, TypeError):
+            # Includes binascii.Error from a malformed stored hash
+            return False, False
+        ok = hmac.compare_digest(actual, expected)
+        return ok, ok and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    # Legacy plaintext row
+    ok = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+    return ok, ok
+
+
+def authenticate(conn, username, password):
+    # Looks the user up by username alone (UNIQUE, so index-backed), checks
+    # the password and upgrades the stored hash when needed
+    c = conn.cursor()
+    c.execute("SELECT id, password FROM users WHERE username=?", (username,))
+    row = c.fetchone()
+    if row is None:
+        # Burn comparable time so unknown usernames aren't distinguishable
+        _scrypt(password, b'\0' * SALT_BYTES, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return False
+    ok, needs_rehash = verify_password(row[1], password)
+    if ok and needs_rehash:
+        c.execute("UPDATE users SET password=? WHERE id=?", (hash_password(password), row[0]))
+        conn.commit()
+    return ok
+
+
+def calibrate(target_ms=50.0, max_n=2 ** 20, rounds=3):
+    # Largest power-of-two n whose hash time stays within target_ms
+    salt = secrets.token_bytes(SALT_BYTES)
+    best, n = 2 ** 10, 2 ** 10
+    timings = []
+    while n <= max_n:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            _scrypt('calibration', salt, n, SCRYPT_R, SCRYPT_P)
+        ms = (time.perf_counter() - start) * 1000 / rounds
+        timings.append((n, ms))
+        if ms > target_ms:
+            break
+        best = n
+        n *= 2
+    return best, timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pick the scrypt work factor for a target login latency.')
+    parser.add_argument('--target-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    best, timings = calibrate(args.target_ms)
+    for n, ms in timings:
+        print(f'n=2**{n.bit_length() - 1:<2} {ms:8.1f} ms')
+    print(f'PASSWORD_SCRYPT_N={best}')
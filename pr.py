@@ -1,83 +1,12 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session
-import sqlite3
-import pandas as pd
-from sklearn.preprocessing import LabelEncoder
-from sklearn.svm import SVC
-from sklearn.cluster import KMeans
-import folium
-import os
+from flask import Blueprint, render_template_string, request, redirect, url_for, session
+import threading
+from core import load_models, predict_crime, generate_heatmap, heatmap_regions
+from auth import login_user, register_user
+from config import settings
 
-app = Flask(__name__)
-app.secret_key = 'secret123'
-
-# === DB Setup ===
-if not os.path.exists('users.db'):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)''')
-    conn.commit()
-    conn.close()
-
-# === Load Data and Train Models ===
-crime_data = pd.read_csv('crime_data.csv')
-
-label_encoders = {}
-model_svm = None
-model_kmeans = None
-
-def preprocess(df):
-    df = df.dropna()
-    for col in ['Location', 'Time', 'CrimeType']:
-        df[col] = df[col].astype(str).str.lower().str.strip()
-        
-        if col not in label_encoders:
-            le = LabelEncoder()
-            df[col] = df[col].fillna('unknown')
-            le.fit(list(df[col].unique()) + ['unknown'])
-            df[col] = le.transform(df[col])
-            label_encoders[col] = le
-        else:
-            le = label_encoders[col]
-            # Replace unseen values with 'unknown'
-            df[col] = df[col].apply(lambda x: x if x in le.classes_ else 'unknown')
-            
-            if 'unknown' not in le.classes_:
-                le.classes_ = np.append(le.classes_, 'unknown')
-            df[col] = le.transform(df[col])    
-           # df[col] = label_encoders[col].transform(df[col])
-    return df
-
-def train_models():
-    global model_svm, model_kmeans
-    df = preprocess(crime_data.copy())
-    X = df[['Location', 'Time', 'CrimeType']]
-    y = df['Severity'] if 'Severity' in df else df.iloc[:, -1]
-    model_svm = SVC()
-    model_svm.fit(X, y)
-    model_kmeans = KMeans(n_clusters=5, n_init=10)
-    model_kmeans.fit(df[['Latitude', 'Longitude']])
-
-def predict_crime(location, time, crime_type):
-    df = pd.DataFrame([[location, time, crime_type]], columns=['Location', 'Time', 'CrimeType'])
-    df = preprocess(df)
-    prediction = model_svm.predict(df)[0]
-    return f"Predicted Crime Severity: {prediction}"
-
-def generate_heatmap():
-    df = crime_data.copy()
-    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=12)
-    for _, row in df.iterrows():
-        folium.CircleMarker(
-            location=[row['Latitude'], row['Longitude']],
-            radius=5,
-            popup=row['CrimeType'],
-            fill=True,
-            color='red',
-            fill_opacity=0.7
-        ).add_to(map_)
-    return map_._repr_html_()
-
-train_models()
+# Dark-theme UI, mounted under /pr by app.py. Models, data and the map engine
+# come from core.py, so this variant no longer trains its own copy.
+bp = Blueprint('pr', __name__)
 
 base_css = """
 <style>
@@ -154,7 +83,7 @@ th {
 </style>
 """
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template_string(f'''
     <html><head><title>Safety Locator</title>{base_css}</head>
@@ -178,26 +107,20 @@ def index():
 
             <p style="margin-top:20px;">Together, we can create a safer environment by using technology to stay aware and alert. Let’s begin.</p>
 
-            <a href="{{{{ url_for('login') }}}}" class="button">Login</a>
-            <a href="{{{{ url_for('register') }}}}" class="button" style="background-color:#28a745;">Register</a>
+            <a href="{{{{ url_for('.login') }}}}" class="button">Login</a>
+            <a href="{{{{ url_for('.register') }}}}" class="button" style="background-color:#28a745;">Register</a>
         </div>
     </body></html>
     ''')
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
-        u, p = request.form['username'], request.form['password']
-        try:
-            conn = sqlite3.connect('users.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (u, p))
-            conn.commit()
-            conn.close()
-            return redirect(url_for('login'))
-        except:
-            return "Username already exists."
+        error = register_user(request.form['username'], request.form['password'])
+        if error:
+            return error
+        return redirect(url_for('.login'))
     return render_template_string(f'''
     <html><head><title>Register</title>{base_css}</head>
     <body>
@@ -208,24 +131,17 @@ def register():
             <input name="password" type="password" placeholder="Create password" required>
             <input type="submit" value="Register">
         </form>
-        <p><a href="{{{{ url_for('login') }}}}" class="button" style="background-color:#6c757d;">Already have an account?</a></p>
+        <p><a href="{{{{ url_for('.login') }}}}" class="button" style="background-color:#6c757d;">Already have an account?</a></p>
     </div></body></html>
     ''')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        u, p = request.form['username'], request.form['password']
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE username=? AND password=?", (u, p))
-        user = c.fetchone()
-        conn.close()
-        if user:
-            session['username'] = u
-            return redirect(url_for('dashboard'))
-        else:
-            return "Invalid credentials."
+        error = login_user(request.form['username'], request.form['password'])
+        if error:
+            return error
+        return redirect(url_for('.dashboard'))
     return render_template_string(f'''
     <html><head><title>Login</title>{base_css}</head>
     <body>
@@ -236,25 +152,30 @@ def login():
             <input name="password" type="password" placeholder="Password" required>
             <input type="submit" value="Login">
         </form>
-        <p><a href="{{{{ url_for('register') }}}}" class="button" style="background-color:#6c757d;">New user? Register</a></p>
+        <p><a href="{{{{ url_for('.register') }}}}" class="button" style="background-color:#6c757d;">New user? Register</a></p>
     </div></body></html>
     ''')
-sample_data = [
-    ("Mumbai", "22:00", "Harassment", 3, 19.0760, 72.8777),
-    ("Delhi", "21:30", "Assault", 4, 28.7041, 77.1025),
-    ("Chennai", "23:45", "Molestation", 3, 13.0827, 80.2707),
-    ("Kolkata", "20:15", "Stalking", 2, 22.5726, 88.3639),
-    ("Bangalore", "19:00", "Verbal Abuse", 2, 12.9716, 77.5946),
-    ("Hyderabad", "18:30", "Assault", 4, 17.3850, 78.4867),
-    ("Ahmedabad", "22:45", "Harassment", 3, 23.0225, 72.5714),
-    ("Pune", "21:00", "Molestation", 3, 18.5204, 73.8567),
-    ("Jaipur", "20:30", "Stalking", 2, 26.9124, 75.7873),
-    ("Lucknow", "23:00", "Verbal Abuse", 2, 26.8467, 80.9462)
-]
-@app.route('/dashboard', methods=['GET', 'POST'])
+
+# Risk scores for the cities this dashboard covers (replaces the old
+# hard-coded sample rows), built on first view
+_risk_table = None
+_risk_lock = threading.Lock()
+
+def get_risk_table():
+    global _risk_table
+    import pandas as pd
+    from cleaning import clean_incidents
+    from risk import RiskTable
+    with _risk_lock:
+        if _risk_table is None:
+            _risk_table = RiskTable(clean_incidents(pd.read_csv(settings.data.current_crime_data))[0])
+        return _risk_table
+
+@bp.route('/dashboard', methods=['GET', 'POST'])
 def dashboard():
     if 'username' not in session:
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
+    load_models()
 
     prediction = None
     if request.method == 'POST':
@@ -262,6 +183,7 @@ def dashboard():
         time = request.form['time']
         crime_type = request.form['crime_type']
         prediction = predict_crime(location, time, crime_type)
+    risk = get_risk_table().page(request.args.get('page', 1, type=int))
 
     return render_template_string(f'''
     <html><head><title>Dashboard</title>{base_css}</head>
@@ -275,38 +197,50 @@ def dashboard():
             <input type="submit" value="Predict Crime Severity">
         </form>
         {{% if prediction %}}<h3>{{{{ prediction }}}}</h3>{{% endif %}}
-        <a href="{{{{ url_for('heatmap') }}}}" class="button">🔍 View Crime Hotspots</a>
-        <a href="{{{{ url_for('logout') }}}}" class="button" style="background-color:#6c757d;">Logout</a>
+        <a href="{{{{ url_for('.heatmap') }}}}" class="button">🔍 View Crime Hotspots</a>
+        <a href="{{{{ url_for('.logout') }}}}" class="button" style="background-color:#6c757d;">Logout</a>
         
-        <h2 style="margin-top:40px;">📋 Sample Crime Data</h2>
+        <h2 style="margin-top:40px;">📋 Location Risk Scores</h2>
         <table>
             <tr>
-                <th>Location</th><th>Time</th><th>CrimeType</th><th>Severity</th><th>Latitude</th><th>Longitude</th>
+                <th>Location</th><th>Incidents</th><th>Risk Score</th><th>Avg Severity</th><th>Peak Hour</th><th>Night / Morning / Afternoon / Evening</th>
             </tr>
-            {''.join(f"<tr><td>{l}</td><td>{t}</td><td>{c}</td><td>{s}</td><td>{lat}</td><td>{lon}</td></tr>" for l,t,c,s,lat,lon in sample_data)}
+            {{% for r in risk.rows %}}
+            <tr><td>{{{{ r.location }}}}</td><td>{{{{ r.incidents }}}}</td><td>{{{{ r.score }}}}</td><td>{{{{ r.mean_severity }}}}</td><td>{{{{ r.peak_hour or '-' }}}}</td><td>{{{{ r.profile.values()|join(' / ') }}}}</td></tr>
+            {{% endfor %}}
         </table>
+        <p>
+            {{% if risk.page > 1 %}}<a href="{{{{ url_for('.dashboard', page=risk.page - 1) }}}}">← Prev</a>{{% endif %}}
+            Page {{{{ risk.page }}}} of {{{{ risk.pages }}}}
+            {{% if risk.page < risk.pages %}}<a href="{{{{ url_for('.dashboard', page=risk.page + 1) }}}}">Next →</a>{{% endif %}}
+        </p>
     </div>
     </body></html>
-    ''', prediction=prediction)
+    ''', prediction=prediction, risk=risk)
 
-@app.route('/heatmap')
+@bp.route('/heatmap')
 def heatmap():
     if 'username' not in session:
-        return redirect(url_for('login'))
-    map_html = generate_heatmap()
+        return redirect(url_for('.login'))
+    load_models()
+    map_html = generate_heatmap(request.args.get('region'))
     return render_template_string(f'''
     <html><head><title>Heatmap</title>{base_css}</head>
     <body>
         <h2>🗺️ Crime Hotspot Heatmap</h2>
+        <p>{{% for region in regions %}}<a href="{{{{ url_for('.heatmap', region=region) }}}}">{{{{ region }}}}</a> {{% endfor %}}</p>
         <div class="map-container">{{{{ map_html|safe }}}}</div>
-        <a href="{{{{ url_for('dashboard') }}}}" class="button">← Back to Dashboard</a>
+        <a href="{{{{ url_for('.dashboard') }}}}" class="button">← Back to Dashboard</a>
     </body></html>
-    ''', map_html=map_html)
+    ''', map_html=map_html, regions=heatmap_regions())
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
-    session.pop('username', None)
-    return redirect(url_for('index'))
+    # Drops the server-side session row as well
+    session.clear()
+    return redirect(url_for('.index'))
 
 if __name__ == '__main__':
+    # Serves every UI; this one is at /pr
+    from app import app
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import cProfile
+import os
+import random
+import re
+import time
+
+from flask import g, request, session
+
+from config import settings
+
+# === Settings ===
+# PROFILE_SAMPLE_RATE: fraction of requests profiled automatically (0 = off)
+# PROFILE_ADMINS: comma separated usernames allowed to force a profile with
+#   the "X-Profile: 1" header or the "?profile=1" query parameter
+# PROFILE_DIR / PROFILE_KEEP: where .prof files go and how many are kept
+PROFILE_DIR = settings.profiling.dir
+PROFILE_SAMPLE_RATE = settings.profiling.sample_rate
+PROFILE_KEEP = settings.profiling.keep
+PROFILE_ADMINS = set(settings.profiling.admins)
+
+
+def _requested_by_admin():
+    if session.get('username') not in PROFILE_ADMINS:
+        return False
+    return request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+
+
+def _should_profile():
+    if _requested_by_admin():
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _rotate(directory, keep):
+    files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.prof')]
+    files.sort(key=os.path.getmtime)
+    for path in files[:max(len(files) - keep, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _dump(profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unknown')
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{os.getpid()}-{endpoint}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    _rotate(PROFILE_DIR, PROFILE_KEEP)
+    return name
+
+
+def init_profiling(app):
+    # Profiles only the request handling thread; open the dumps offline with
+    # `python -m pstats profiles/<file>.prof` or snakeviz.
+    @app.before_request
+    def _start_profile():
+        if not _should_profile():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return
+        g._profiler = profiler
+
+    @app.after_request
+    def _stop_profile(response):
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers['X-Profile-Id'] = _dump(profiler)
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # Request failed before after_request ran; keep the profile anyway
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _dump(profiler)
+
+    return app
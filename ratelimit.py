@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import settings
+
+# === Login throttling ===
+# Token buckets per client IP and per username, checked before the users
+# table is queried or a password hashed. Buckets live in process memory; with
+# RATE_LIMIT_DB set they are kept in a small SQLite file instead so every
+# worker enforces the same budget. LOGIN_RATE_LIMIT=0 turns throttling off.
+RATE_LIMIT_ENABLED = settings.auth.login_rate_limit
+RATE_LIMIT_DB = settings.auth.rate_limit_db
+IP_BURST = settings.auth.login_ip_burst
+IP_PER_MINUTE = settings.auth.login_ip_per_minute
+USER_BURST = settings.auth.login_user_burst
+USER_PER_MINUTE = settings.auth.login_user_per_minute
+MAX_KEYS = 100_000
+
+
+class TokenBucketLimiter:
+
+    def __init__(self, capacity, per_second, db_path=None, name='default', max_keys=MAX_KEYS):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.db_path = db_path
+        self.name = name
+        self.max_keys = max_keys
+        self.allowed = 0
+        self.rejected = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        if db_path:
+            with sqlite3.connect(db_path, timeout=5) as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''CREATE TABLE IF NOT EXISTS rate_limits (
+                    name TEXT, key TEXT, tokens REAL, updated REAL, PRIMARY KEY (name, key))''')
+
+    def _refill(self, tokens, updated, now):
+        return min(self.capacity, tokens + (now - updated) * self.per_second)
+
+    def _take_memory(self, key, cost, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = self._refill(tokens, updated, now)
+            ok = tokens >= max(cost, 1)
+            if ok:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # Oldest untouched bucket; it would have refilled by now anyway
+                self._buckets.popitem(last=False)
+            return ok
+
+    def _take_shared(self, key, cost, now):
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT tokens, updated FROM rate_limits WHERE name=? AND key=?',
+                               (self.name, key)).fetchone()
+            tokens = self._refill(*row, now) if row else self.capacity
+            ok = tokens >= max(cost, 1)
+            if ok:
+                tokens -= cost
+            conn.execute('INSERT OR REPLACE INTO rate_limits (name, key, tokens, updated) VALUES (?, ?, ?, ?)',
+                         (self.name, key, tokens, now))
+            conn.execute('COMMIT')
+            return ok
+        finally:
+            conn.close()
+
+    def allow(self, key, cost=1):
+        # cost=0 only checks that a token is available
+        now = time.time()
+        ok = self._take_shared(key, cost, now) if self.db_path else self._take_memory(key, cost, now)
+        if cost:
+            if ok:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+        return ok
+
+    def stats(self):
+        return {'allowed': self.allowed, 'rejected': self.rejected}
+
+
+class LoginThrottle:
+    # Every attempt spends a token from the client's IP bucket. A username's
+    # bucket must have a token left to try, but only failed attempts spend
+    # it, so a user who knows the password isn't locked out by their own logins.
+
+    def __init__(self, db_path=RATE_LIMIT_DB or None, enabled=RATE_LIMIT_ENABLED):
+        self.enabled = enabled
+        self.by_ip = TokenBucketLimiter(IP_BURST, IP_PER_MINUTE / 60, db_path, 'ip')
+        self.by_user = TokenBucketLimiter(USER_BURST, USER_PER_MINUTE / 60, db_path, 'user')
+        self.blocked_ip = 0
+        self.blocked_user = 0
+        self.failures = 0
+
+    def attempt(self, ip, username=None):
+        if not self.enabled:
+            return True
+        if not self.by_ip.allow(ip or 'unknown'):
+            self.blocked_ip += 1
+            return False
+        if username is not None and not self.by_user.allow(username, cost=0):
+            self.blocked_user += 1
+            return False
+        return True
+
+    def failed(self, username):
+        self.failures += 1
+        if not self.enabled:
+            return
+        self.by_user.allow(username)
+
+    def stats(self):
+        return {'attempts_allowed': self.by_ip.allowed, 'blocked_by_ip': self.blocked_ip,
+                'blocked_by_username': self.blocked_user, 'failed_logins': self.failures}
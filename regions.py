@@ -0,0 +1,140 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from cleaning import TEXT_COLUMNS, normalize_text
+
+# === Per-region models ===
+# Incidents are split by region. A row belongs to the gazetteer region of
+# the nearest known place within radius_km; rows far from every place fall
+# into a grid_deg-sized lat/lon cell named 'grid:<row>:<col>'. Each region
+# has its own label encoders, SVC and KMeans, so a model only sees its own
+# city's locations and coordinates. Regions are fitted in a process pool. A
+# region's fitted models are reused while its rows are unchanged (same
+# fingerprint), so adding a city fits only that city.
+RegionModel = namedtuple('RegionModel', ['region', 'fingerprint', 'rows', 'encoders', 'svm', 'kmeans'])
+
+
+def encode_features(df, encoders):
+    # Text columns -> LabelEncoder codes. Lower-casing and the unseen ->
+    # 'unknown' mapping run once per category, then the row codes are
+    # gathered, so no column is copied as strings. Columns missing from
+    # `encoders` are fitted on df and added.
+    from sklearn.preprocessing import LabelEncoder
+    encoded = {}
+    for col in TEXT_COLUMNS:
+        values = df[col].array if isinstance(df[col].dtype, pd.CategoricalDtype) else normalize_text(df[col])
+        keys = values.categories.str.lower()
+        le = encoders.get(col)
+        if le is None:
+            le = LabelEncoder().fit(list(keys.unique()) + ['unknown'])
+            encoders[col] = le
+        keys = keys.where(keys.isin(le.classes_), 'unknown')
+        # Missing values (code -1) pick the trailing 'unknown'
+        lookup = np.append(le.transform(keys), le.transform(['unknown']))
+        encoded[col] = lookup[values.codes]
+    return pd.DataFrame(encoded, index=df.index)
+
+
+def fingerprint(df):
+    # Order-independent hash of a region's rows
+    return int(hash_pandas_object(df, index=False).to_numpy().sum(dtype=np.uint64))
+
+
+class RegionIndex:
+
+    def __init__(self, places, radius_km=50.0, grid_deg=1.0):
+        self.radius_km = radius_km
+        self.grid_deg = grid_deg
+        self._lat = np.radians([p.latitude for p in places])
+        self._lon = np.radians([p.longitude for p in places])
+        self._regions = np.array([p.region for p in places], dtype=object)
+
+    def assign(self, lat, lon, chunk=65536):
+        # Region name for every (lat, lon)
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        out = np.empty(len(lat), dtype=object)
+        near = np.zeros(len(lat), dtype=bool)
+        if len(self._regions):
+            for start in range(0, len(lat), chunk):
+                la = np.radians(lat[start:start + chunk])[:, None]
+                lo = np.radians(lon[start:start + chunk])[:, None]
+                a = np.sin((self._lat - la) / 2) ** 2 + np.cos(la) * np.cos(self._lat) * np.sin((self._lon - lo) / 2) ** 2
+                nearest = a.argmin(axis=1)
+                dist_km = 6371.0 * 2 * np.arcsin(np.sqrt(a[np.arange(len(nearest)), nearest]))
+                hit = dist_km <= self.radius_km
+                out[start:start + chunk][hit] = self._regions[nearest[hit]]
+                near[start:start + chunk] = hit
+        far = ~near
+        if far.any():
+            rows = pd.Series(np.floor(lat[far] / self.grid_deg).astype(np.int64)).astype(str)
+            cols = pd.Series(np.floor(lon[far] / self.grid_deg).astype(np.int64)).astype(str)
+            out[far] = ('grid:' + rows.str.cat(cols, sep=':')).to_numpy()
+        return out
+
+
+def assign_regions(lat, lon):
+    # Region per point with the configured gazetteer, radius and grid, as
+    # core.point_regions() assigns them; for the offline tools
+    from config import settings
+    from gazetteer import Gazetteer
+    m = settings.model
+    if not m.region_sharding:
+        return np.full(len(lat), 'all', dtype=object)
+    return RegionIndex(Gazetteer.load(settings.data.gazetteer).places, m.region_radius_km, m.region_grid_deg).assign(lat, lon)
+
+
+def fit_region(region, df, fp, svm_kernel='rbf', svm_c=1.0, kmeans_clusters=5, kmeans_n_init=10):
+    from sklearn.cluster import KMeans
+    from sklearn.dummy import DummyClassifier
+    from sklearn.svm import SVC
+    encoders = {}
+    features = encode_features(df, encoders)
+    severity = df['Severity']
+    # SVC needs two classes; a region with one severity level predicts it
+    svm = SVC(kernel=svm_kernel, C=svm_c) if severity.nunique() > 1 else DummyClassifier(strategy='most_frequent')
+    svm.fit(features, severity)
+    coords = df[['Latitude', 'Longitude']]
+    # Fixed seed: every worker fitting the same rows gets the same clusters,
+    # which the /api/hotspots ETag relies on
+    kmeans = KMeans(n_clusters=min(kmeans_clusters, len(coords.drop_duplicates())), n_init=kmeans_n_init,
+                    random_state=0)
+    kmeans.fit(coords)
+    return RegionModel(region, fp, len(df), encoders, svm, kmeans)
+
+
+def train_regions(df, regions, previous=None, workers=0, only_new=False, **params):
+    # regions: region name per row of df. Returns {region: RegionModel}.
+    # Regions in `previous` keep their models if their rows are unchanged
+    # (or, with only_new, regardless); regions no longer present are dropped.
+    previous = previous or {}
+    models = {}
+    todo = []
+    for region, idx in pd.Series(regions).groupby(regions, sort=True).indices.items():
+        part = df.iloc[idx].reset_index(drop=True)
+        old = previous.get(region)
+        if old is not None and only_new:
+            models[region] = old
+            continue
+        fp = fingerprint(part)
+        if old is not None and old.fingerprint == fp:
+            models[region] = old
+        else:
+            todo.append((region, part, fp))
+    workers = min(len(todo), workers or os.cpu_count() or 1)
+    if workers > 1:
+        # joblib's loky workers are fresh interpreters: a plain fork() copies
+        # the parent's OpenMP thread pool state and hangs once sklearn has
+        # used it, and spawn/forkserver re-run the app's __main__
+        from joblib import Parallel, delayed
+        fitted = Parallel(n_jobs=workers, backend='loky')(
+            delayed(fit_region)(region, part, fp, **params) for region, part, fp in todo)
+    else:
+        fitted = [fit_region(region, part, fp, **params) for region, part, fp in todo]
+    for model in fitted:
+        models[model.region] = model
+    return models
@@ -0,0 +1,92 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics import parse_minutes
+
+# === Per-location risk scores ===
+# Running totals per Location (incidents, severity sum, incidents per hour of
+# day) kept in flat arrays. New incidents are folded in with one group-by over
+# just the new rows, and the sorted view used for pagination is rebuilt only
+# when something changed.
+PERIODS = [('Night', 0, 6), ('Morning', 6, 12), ('Afternoon', 12, 18), ('Evening', 18, 24)]
+
+
+class RiskTable:
+
+    def __init__(self, df=None):
+        self._names = []
+        self._index = {}
+        self._count = np.zeros(0, dtype=np.int64)
+        self._severity = np.zeros(0, dtype=float)
+        self._hours = np.zeros((0, 24), dtype=np.int64)
+        self._lock = threading.Lock()
+        self._sorted = None
+        if df is not None:
+            self.ingest(df)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _grow(self, names):
+        new = [n for n in names if n not in self._index]
+        if not new:
+            return
+        for n in new:
+            self._index[n] = len(self._names)
+            self._names.append(n)
+        self._count = np.concatenate([self._count, np.zeros(len(new), dtype=np.int64)])
+        self._severity = np.concatenate([self._severity, np.zeros(len(new))])
+        self._hours = np.vstack([self._hours, np.zeros((len(new), 24), dtype=np.int64)])
+
+    def ingest(self, df):
+        if not len(df):
+            return
+        names = df['Location'].astype(str).str.strip().str.title()
+        severity = pd.to_numeric(df['Severity'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        hours = (parse_minutes(df['Time']) // 60).fillna(-1).astype(np.int64).to_numpy()
+        codes, uniques = pd.factorize(names)
+        with self._lock:
+            self._grow(list(uniques))
+            rows = np.array([self._index[n] for n in uniques], dtype=np.int64)[codes]
+            np.add.at(self._count, rows, 1)
+            np.add.at(self._severity, rows, severity)
+            known = hours >= 0
+            np.add.at(self._hours, (rows[known], hours[known]), 1)
+            self._sorted = None
+
+    def _order(self):
+        with self._lock:
+            if self._sorted is None:
+                # Highest severity-weighted score first, then most incidents
+                self._sorted = np.lexsort((-self._count, -self._severity))
+            return self._sorted
+
+    def _row(self, i):
+        hours = self._hours[i]
+        profile = {name: int(hours[start:end].sum()) for name, start, end in PERIODS}
+        return {
+            'location': self._names[i],
+            'incidents': int(self._count[i]),
+            'score': round(float(self._severity[i]), 2),
+            'mean_severity': round(float(self._severity[i] / self._count[i]), 2) if self._count[i] else 0.0,
+            'profile': profile,
+            'peak_hour': f'{int(hours.argmax()):02d}:00' if hours.any() else None,
+        }
+
+    def page(self, page=1, per_page=20):
+        order = self._order()
+        pages = max(1, -(-len(order) // per_page))
+        page = min(max(1, page), pages)
+        start = (page - 1) * per_page
+        return {
+            'rows': [self._row(i) for i in order[start:start + per_page]],
+            'page': page,
+            'pages': pages,
+            'total': len(order),
+        }
+
+    def get(self, location):
+        i = self._index.get(str(location).strip().title())
+        return None if i is None else self._row(i)
@@ -0,0 +1,66 @@
+import numpy as np
+
+from kde import METERS_PER_DEG_LAT
+
+# === Route safety scoring ===
+# A route (polyline of lat/lon points) is resampled every SAMPLE_SPACING_M and
+# each sample reads the precomputed KDE density grid, so scoring is a handful
+# of array operations regardless of how many incidents there are.
+SAMPLE_SPACING_M = 25.0
+MAX_SAMPLES = 200_000
+
+
+def _segment_lengths_m(lat, lon):
+    # Equirectangular distances; accurate to well under 1% at route scale
+    mean_lat = np.radians((lat[:-1] + lat[1:]) / 2)
+    dy = np.diff(lat) * METERS_PER_DEG_LAT
+    dx = np.diff(lon) * METERS_PER_DEG_LAT * np.cos(mean_lat)
+    return np.hypot(dx, dy)
+
+
+def sample_polyline(lat, lon, spacing_m=SAMPLE_SPACING_M):
+    # Evenly spaced points along the route and the segment each falls on
+    lengths = _segment_lengths_m(lat, lon)
+    cumulative = np.concatenate([[0.0], np.cumsum(lengths)])
+    total = cumulative[-1]
+    spacing_m = max(spacing_m, total / MAX_SAMPLES)
+    distances = np.append(np.arange(0.0, total, spacing_m), total)
+    segment = np.clip(np.searchsorted(cumulative, distances, side='right') - 1, 0, len(lengths) - 1)
+    seg_len = lengths[segment]
+    t = np.divide(distances - cumulative[segment], seg_len, out=np.zeros_like(distances), where=seg_len > 0)
+    sample_lat = lat[segment] + t * (lat[segment + 1] - lat[segment])
+    sample_lon = lon[segment] + t * (lon[segment + 1] - lon[segment])
+    return sample_lat, sample_lon, segment, lengths
+
+
+def score_route(surface, points, spacing_m=SAMPLE_SPACING_M, top_n=3):
+    points = np.asarray(points, dtype=float)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 2:
+        raise ValueError('A route needs at least two [lat, lon] points')
+    lat, lon = points[:, 0], points[:, 1]
+    sample_lat, sample_lon, segment, lengths = sample_polyline(lat, lon, spacing_m)
+    density = surface.value_at(sample_lat, sample_lon)
+
+    n_segments = len(lengths)
+    samples = np.bincount(segment, minlength=n_segments)
+    seg_mean = np.bincount(segment, weights=density, minlength=n_segments) / np.maximum(samples, 1)
+    seg_max = np.zeros(n_segments)
+    np.maximum.at(seg_max, segment, density)
+
+    # 0-100 relative to the densest cell in the data set
+    peak = surface.density.max() or 1.0
+    riskiest = np.argsort(seg_mean)[::-1][:top_n]
+    return {
+        'length_km': round(float(lengths.sum()) / 1000, 3),
+        'risk_score': round(100 * float(density.mean()) / peak, 1),
+        'max_risk': round(100 * float(density.max()) / peak, 1),
+        # Severity-weighted incidents per km of route (density integrated along it)
+        'exposure': round(float((seg_mean * lengths).sum()) / 1000, 3),
+        'samples': int(len(density)),
+        'riskiest_segments': [
+            {'segment': int(i), 'start': [float(lat[i]), float(lon[i])], 'end': [float(lat[i + 1]), float(lon[i + 1])],
+             'length_m': round(float(lengths[i]), 1), 'risk_score': round(100 * float(seg_mean[i]) / peak, 1),
+             'max_risk': round(100 * float(seg_max[i]) / peak, 1)}
+            for i in riskiest if seg_mean[i] > 0
+        ],
+    }
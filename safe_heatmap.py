@@ -1,50 +1,153 @@
+import argparse
+import hashlib
+import os
+
 import folium
+import numpy as np
 import pandas as pd
 from folium.plugins import HeatMap
 
-# Sample data for safe locations
-safe_locations = pd.DataFrame({
-    'Location': ['Park Street', 'Library Road', 'Greenway', 'Sunset Blvd'],
-    'Latitude': [13.0827, 13.0350, 13.0455, 13.0802],
-    'Longitude': [80.2707, 80.2315, 80.2502, 80.2837],
-    'SafetyLevel': ['High', 'High', 'Moderate', 'High']
-})
-
-# Initialize folium map
-m = folium.Map(
-    location=[safe_locations['Latitude'].mean(), safe_locations['Longitude'].mean()],
-    zoom_start=13,
-    tiles='CartoDB positron'
-)
-
-# ✅ Add a title using HTML injected into the map
-title_html = '''
+from config import settings
+from kde import build_surface, fft_convolve
+from map_layers import cells_to_geojson
+from regions import assign_regions
+
+# === Safe zones ===
+# Grid cells near where incidents happen (within REACH_M of one) whose
+# smoothed, severity-weighted incident density stays below a small fraction
+# of the worst cell. Everything is computed on the KDE grid with array
+# operations and drawn as one GeoJSON layer. Data spanning several cities is
+# split by region (see regions.py) and each region gets its own grid, scaled
+# to its own worst cell.
+CELL_M = 250.0
+REACH_M = 1500.0
+MAX_FRACTION = 0.10
+HIGH_FRACTION = 0.02
+FINGERPRINT_TAG = '<!-- safe-zones fingerprint: {} -->'
+
+
+def find_safe_zones(df, cell_m=CELL_M, reach_m=REACH_M, max_fraction=MAX_FRACTION):
+    df = df.dropna(subset=['Latitude', 'Longitude'])
+    weights = pd.to_numeric(df['Severity'], errors='coerce').fillna(1) if 'Severity' in df else None
+    surface = build_surface(df['Latitude'], df['Longitude'], weights, cell_m=cell_m, pad_m=reach_m)
+
+    # Cells within reach of any incident: dilate the occupied cells with a
+    # disc-shaped kernel (FFT convolution again)
+    radius = max(1, int(round(reach_m / surface.cell_m)))
+    offsets = np.arange(-radius, radius + 1)
+    disc = (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius ** 2).astype(float)
+    near = fft_convolve((surface.counts > 0).astype(float), disc) > 0.5
+
+    peak = surface.density.max() or 1.0
+    relative = surface.density / peak
+    rows, cols = np.nonzero(near & (relative <= max_fraction))
+    lats, lons = surface.cell_center(rows, cols)
+    return pd.DataFrame({
+        'Latitude': lats,
+        'Longitude': lons,
+        'SafetyLevel': np.where(relative[rows, cols] <= HIGH_FRACTION, 'High', 'Moderate'),
+        'Incidents': surface.counts[rows, cols],
+        'RelativeRisk': relative[rows, cols].round(3),
+        'CellLat': surface.cell_lat,
+        'CellLon': surface.cell_lon,
+    }), surface
+
+
+def find_regional_safe_zones(df, **params):
+    # find_safe_zones() per region, concatenated with a Region column
+    df = df.dropna(subset=['Latitude', 'Longitude'])
+    regions = assign_regions(df['Latitude'], df['Longitude'])
+    zones = [find_safe_zones(group, **params)[0].assign(Region=region) for region, group in df.groupby(regions)]
+    return pd.concat(zones, ignore_index=True)
+
+
+def render_safe_map(zones, title='Safety Locations'):
+    # Opens on the region with the most safe zones when there are several
+    focus = zones
+    if 'Region' in zones and len(zones):
+        focus = zones[zones['Region'] == zones['Region'].value_counts().index[0]]
+    m = folium.Map(
+        location=[focus['Latitude'].mean(), focus['Longitude'].mean()] if len(focus) else [0, 0],
+        zoom_start=13,
+        tiles='CartoDB positron'
+    )
+    title_html = f'''
      <div style="position: fixed; top: 10px; width: 100%; text-align: center; z-index:9999;">
          <h3 style="font-size:22px; color:green; background-color: white; display: inline-block; padding: 5px 15px; border-radius: 8px;">
-         <b>Safety Locations</b></h3>
+         <b>{title}</b></h3>
      </div>
 '''
-m.get_root().html.add_child(folium.Element(title_html))
-
-# Add green circles for safe locations
-for idx, row in safe_locations.iterrows():
-    folium.CircleMarker(
-        location=[row['Latitude'], row['Longitude']],
-        radius=10,
-        color='green',
-        fill=True,
-        fill_color='green',
-        fill_opacity=0.6,
-        popup=f"Location: {row['Location']}<br>Safety Level: {row['SafetyLevel']}"
+    m.get_root().html.add_child(folium.Element(title_html))
+
+    colors = {'High': 'green', 'Moderate': 'yellowgreen'}
+    geojson = cells_to_geojson(
+        zones['Latitude'], zones['Longitude'], zones['CellLat'].to_numpy() / 2, zones['CellLon'].to_numpy() / 2,
+        {'SafetyLevel': zones['SafetyLevel'], 'Incidents': zones['Incidents'], 'RelativeRisk': zones['RelativeRisk']})
+    folium.GeoJson(
+        geojson,
+        name='Safe zones',
+        style_function=lambda f: {'color': colors[f['properties']['SafetyLevel']], 'weight': 0,
+                                  'fillColor': colors[f['properties']['SafetyLevel']], 'fillOpacity': 0.45},
+        tooltip=folium.GeoJsonTooltip(fields=['SafetyLevel', 'Incidents', 'RelativeRisk'],
+                                      aliases=['Safety Level', 'Incidents', 'Relative risk']),
     ).add_to(m)
 
-# Add heatmap with green gradient
-HeatMap(
-    safe_locations[['Latitude', 'Longitude']].values,
-    radius=25,
-    gradient={'0.4': 'green', '0.65': 'lime', '1': 'lightgreen'}
-).add_to(m)
+    high = zones[zones['SafetyLevel'] == 'High']
+    if len(high):
+        HeatMap(
+            high[['Latitude', 'Longitude']].values,
+            radius=25,
+            gradient={'0.4': 'green', '0.65': 'lime', '1': 'lightgreen'}
+        ).add_to(m)
+    return m
+
+
+def _fingerprint(data_path, **params):
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+def _stored_fingerprint(out_path):
+    try:
+        with open(out_path, 'rb') as f:
+            f.seek(max(0, os.path.getsize(out_path) - 200))
+            tail = f.read().decode('ascii', 'ignore')
+    except OSError:
+        return None
+    prefix, suffix = FINGERPRINT_TAG.split('{}')
+    start = tail.rfind(prefix)
+    return tail[start + len(prefix):tail.rfind(suffix)] if start >= 0 else None
+
+
+def write_safe_map(data_path=settings.data.crime_data, out_path=settings.data.safe_map, force=False, **params):
+    # Rewrites out_path only when the incident data (or the parameters) changed
+    # since it was last generated; returns True if the file was written.
+    fingerprint = _fingerprint(data_path, **params)
+    if not force and _stored_fingerprint(out_path) == fingerprint:
+        return False
+    zones = find_regional_safe_zones(pd.read_csv(data_path), **params)
+    html = render_safe_map(zones).get_root().render()
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+        f.write('\n' + FINGERPRINT_TAG.format(fingerprint) + '\n')
+    os.replace(tmp_path, out_path)
+    return True
+
 
-# Save to HTML file
-m.save("safe_location_heatmap.html")
-print("✅ Map saved as safe_location_heatmap.html")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate the safe-zone map from incident data.')
+    parser.add_argument('--data', default=settings.data.crime_data)
+    parser.add_argument('--out', default=settings.data.safe_map)
+    parser.add_argument('--cell-m', type=float, default=CELL_M)
+    parser.add_argument('--reach-m', type=float, default=REACH_M)
+    parser.add_argument('--force', action='store_true', help='rewrite even if the data is unchanged')
+    args = parser.parse_args()
+    if write_safe_map(args.data, args.out, args.force, cell_m=args.cell_m, reach_m=args.reach_m):
+        print(f"✅ Map saved as {args.out}")
+    else:
+        print(f"{args.out} is up to date")
@@ -0,0 +1,167 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from config import settings
+
+# === Server-side sessions ===
+# The cookie only carries a random session id; the session data lives in an
+# SQLite table shared by all workers. Each process keeps recently used
+# sessions in an LRU cache, so checking a logged-in request normally needs no
+# database access. Cached entries are trusted for SESSION_CACHE_TTL seconds,
+# which bounds how long a revocation made by another worker takes to apply.
+SESSION_DB = settings.cache.session_db or settings.data.users_db
+SESSION_CACHE_SIZE = settings.cache.session_size
+SESSION_CACHE_TTL = settings.cache.session_ttl
+SESSION_LIFETIME = settings.cache.session_lifetime
+
+
+class ServerSession(CallbackDict, SessionMixin):
+
+    def __init__(self, initial=None, sid=None, expires=0.0):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.modified = False
+        self.rotate = False
+
+    def regenerate(self):
+        # New id on privilege change (login) so a planted id is useless
+        self.rotate = True
+        self.modified = True
+
+
+class SqliteSessionInterface(SessionInterface):
+
+    def __init__(self, db_path=SESSION_DB, cache_size=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL,
+                 lifetime=SESSION_LIFETIME):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.lifetime = lifetime
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._saves = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY, username TEXT, data TEXT NOT NULL, expires REAL NOT NULL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions (username)')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    # --- cache ---
+    def _cache_get(self, sid):
+        with self._lock:
+            entry = self._cache.get(sid)
+            if entry is None:
+                return None
+            data, expires, cached_at = entry
+            now = time.time()
+            if expires <= now or now - cached_at > self.cache_ttl:
+                del self._cache[sid]
+                return None
+            self._cache.move_to_end(sid)
+            return data, expires
+
+    def _cache_put(self, sid, data, expires):
+        with self._lock:
+            self._cache[sid] = (data, expires, time.time())
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, sids):
+        with self._lock:
+            for sid in sids:
+                self._cache.pop(sid, None)
+
+    # --- store ---
+    def _load(self, sid):
+        cached = self._cache_get(sid)
+        if cached is not None:
+            return cached
+        with self._connect() as conn:
+            row = conn.execute('SELECT data, expires FROM sessions WHERE sid=?', (sid,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        data = json.loads(row[0])
+        self._cache_put(sid, data, row[1])
+        return data, row[1]
+
+    def _delete(self, conn, sid):
+        conn.execute('DELETE FROM sessions WHERE sid=?', (sid,))
+        self._cache_drop([sid])
+
+    def revoke_session(self, sid):
+        with self._connect() as conn:
+            self._delete(conn, sid)
+
+    def revoke_user(self, username):
+        # Ends every session of a user (e.g. after a password change)
+        with self._connect() as conn:
+            sids = [r[0] for r in conn.execute('SELECT sid FROM sessions WHERE username=?', (username,))]
+            conn.execute('DELETE FROM sessions WHERE username=?', (username,))
+        self._cache_drop(sids)
+        return len(sids)
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE expires<=?', (time.time(),))
+
+    # --- Flask hooks ---
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            loaded = self._load(sid)
+            if loaded is not None:
+                data, expires = loaded
+                return ServerSession(dict(data), sid=sid, expires=expires)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        now = time.time()
+        if not session:
+            if session.sid and session.modified:
+                self.revoke_session(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        # Write when the data changed, or to slide the expiry forward once
+        # less than half the lifetime is left
+        if not session.modified and session.expires - now > self.lifetime / 2:
+            return
+        expires = now + self.lifetime
+        data = dict(session)
+        with self._connect() as conn:
+            if session.sid and session.rotate:
+                self._delete(conn, session.sid)
+            if not session.sid or session.rotate:
+                session.sid = secrets.token_urlsafe(32)
+                session.rotate = False
+            conn.execute('INSERT OR REPLACE INTO sessions (sid, username, data, expires) VALUES (?, ?, ?, ?)',
+                         (session.sid, data.get('username'), json.dumps(data), expires))
+        session.expires = expires
+        self._cache_put(session.sid, data, expires)
+        self._saves += 1
+        if self._saves % 1000 == 0:
+            self.purge_expired()
+        response.set_cookie(
+            name, session.sid, expires=expires, httponly=True, domain=domain, path=path,
+            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app) or 'Lax')
+
+
+def init_sessions(app, **kwargs):
+    app.session_interface = SqliteSessionInterface(**kwargs)
+    return app.session_interface